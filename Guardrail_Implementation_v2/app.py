@@ -1,18 +1,55 @@
 from __future__ import annotations
-from fastapi import FastAPI
+import json
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from llm_client import OllamaClient
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable
+from llm_client import LLMBusyError, OllamaClient
+from response_cache import response_cache_from_env
 import uvicorn
-from guardrails import policy_check_input, policy_check_output
+import guardrails
+import regex_safety
+from guardrails import StreamingOutputGuard, configure_policy_cache, policy_check_input, policy_check_output, soften
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ Open the LLM connection pool on startup and close it on shutdown """
+    await client.start()
+    yield
+    await client.aclose()
+    if response_cache is not None:
+        response_cache.close()
 
 app = FastAPI(
     title="Guardrail Implementation API",
     version="1.0.0",
     description="An API demonstrating Guardrail implementation with FastAPI.",
+    lifespan=lifespan,
+)
+
+client = OllamaClient(
+    base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+    model="gemma3:1b",
+    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "0")) or None,
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
 )
 
-client = OllamaClient(model="gemma3:1b")
+@app.exception_handler(LLMBusyError)
+async def llm_busy_handler(request: Request, exc: LLMBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+#Opt-in guardrail decision cache, e.g. GUARDRAIL_CACHE_MAX_MB=64
+if os.getenv("GUARDRAIL_CACHE_MAX_MB"):
+    configure_policy_cache(
+        max_entries=int(os.getenv("GUARDRAIL_CACHE_MAX_ENTRIES", "10000")),
+        max_bytes=int(float(os.getenv("GUARDRAIL_CACHE_MAX_MB")) * 1024 * 1024),
+        ttl_seconds=float(os.getenv("GUARDRAIL_CACHE_TTL_SECONDS", "300")),
+    )
+
+#Optional LLM response cache, e.g. RESPONSE_CACHE_BACKEND=sqlite RESPONSE_CACHE_MODE=deterministic
+response_cache = response_cache_from_env()
 
 SYSTEM_PROMPT = """
 You are a helpful assistant that can help with tasks.
@@ -41,6 +78,41 @@ async def read_root():
         "version": "1.0.0"
         }  
 
+async def call_llm(user_text: str, temperature: float) -> str:
+    """ client.chat behind the optional response cache """
+    async def call() -> str:
+        return await client.chat(
+            message = [
+                {"role":"system","content":SYSTEM_PROMPT},
+                {"role":"user","content":user_text}
+            ],
+            temperature=temperature
+        )
+    if response_cache is None:
+        return await call()
+    return await response_cache.get_or_call(client.model, SYSTEM_PROMPT, user_text, temperature, call)
+
+@app.get("/responses/cache")
+async def response_cache_stats():
+    """ Hit / miss counters of the LLM response cache """
+    return {"enabled": response_cache is not None, **(response_cache.stats() if response_cache is not None else {})}
+
+@app.get("/guardrails/cache")
+async def guardrail_cache_stats():
+    """ Hit / miss / eviction counters of the guardrail decision cache """
+    cache = guardrails.POLICY_CACHE
+    return {"enabled": cache is not None, **(cache.stats() if cache is not None else {})}
+
+@app.get("/guardrails/regex")
+async def guardrail_regex_stats():
+    """ Regex engine and time budget in use, and how many scans ran without the budget """
+    engine = guardrails.get_engine()
+    return {
+        "engine": engine.engine,
+        "time_budget_seconds": engine.time_budget,
+        "unarmed_budgets": regex_safety.unarmed_budget_count(),
+    }
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
     """ Chat endpoint """
@@ -59,15 +131,8 @@ async def chat(req: ChatRequest):
     user_text = in_res.sanitized_text or req.user_text
     meta = {"input": in_res.meta or {}}
     
-    #Call the LLM
-    raw = await client.chat(
-        message = [
-            {"role":"system","content":SYSTEM_PROMPT},
-            {"role":"user","content":user_text}
-        ],
-        temperature=req.temparature
-    )
-    print(raw)
+    #Call the LLM (or reuse a cached answer for the same sanitized prompt)
+    raw = await call_llm(user_text, req.temparature)
     #Output Policy check
     out_res = policy_check_output(raw)
     meta["output"] = out_res.meta or {}
@@ -84,7 +149,7 @@ async def chat(req: ChatRequest):
     
     #Explicitly check on toxicity and such things before returning to user
     if(out_res.decision == "allow_with_warnings"): 
-        answer = answer.replace("You are","It seems").replace("stupid","confused")
+        answer = soften(answer)
     
     final_decision = (
         "allow_with_warnings"
@@ -95,12 +160,117 @@ async def chat(req: ChatRequest):
     final_reason = "; ".join(r for r in [in_res.reason, out_res.reason])
     
     return ChatResponse(
-        decision = final_reason,
+        decision = final_decision,
         reason = final_reason,
         answer = answer,
         meta = meta
     )
 
+async def _prefetched(first: Optional[str], stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    """ The stream with its already pulled first chunk put back in front """
+    if first is not None:
+        yield first
+    async for token in stream:
+        yield token
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """ StreamingResponse that always runs on_close once it has been served.
+
+    The body generator's own finally only runs if the body was started; a
+    client that disconnects before that would otherwise leave the LLM stream
+    (and its generation slot) open until garbage collection.
+    """
+
+    def __init__(self, content: AsyncIterator[str], on_close: Callable[[], Awaitable[None]], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._on_close()
+
+def _event(kind: str, **fields: Any) -> str:
+    """ One NDJSON line of the /chat/stream response """
+    return json.dumps({"type": kind, **fields}) + "\n"
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """ Streaming chat endpoint.
+
+    Emits NDJSON events: {"type":"chunk","text":...} while the model is
+    generating, then a final {"type":"done",...} or {"type":"refuse",...}.
+    Output guardrails run incrementally, so a refusal cuts the stream (and the
+    upstream generation) off and PII is redacted before a chunk is sent.
+    """
+    in_res = policy_check_input(req.user_text)
+    if in_res.decision == "refuse":
+        refusal = _event(
+            "refuse",
+            reason=in_res.reason,
+            answer="Sorry, I Cannot help you with that request.",
+            meta=in_res.meta or {},
+        )
+        return StreamingResponse(iter([refusal]), media_type="application/x-ndjson")
+
+    user_text = in_res.sanitized_text or req.user_text
+    stream = client.chat_stream(
+        message = [
+            {"role":"system","content":SYSTEM_PROMPT},
+            {"role":"user","content":user_text}
+        ],
+        temperature=req.temparature
+    )
+    #Pulling the first chunk takes the LLM slot, so a busy model still gets the 503 from llm_busy_handler
+    #(and a failing upstream its error status) before the 200 headers are sent
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def events() -> AsyncIterator[str]:
+        meta: Dict[str, Any] = {"input": in_res.meta or {}}
+        guard = StreamingOutputGuard(soften=True)
+        try:
+            async for token in _prefetched(first, stream):
+                text = guard.feed(token)
+                if guard.refusal is not None:
+                    break
+                if text:
+                    yield _event("chunk", text=text)
+            else:
+                text = guard.finish()
+                if guard.refusal is None and text:
+                    yield _event("chunk", text=text)
+        finally:
+            #Stops the upstream generation when we bail out early and frees the LLM slot
+            await stream.aclose()
+
+        if guard.refusal is not None:
+            meta["output"] = guard.refusal.meta or {}
+            yield _event(
+                "refuse",
+                reason=guard.refusal.reason,
+                answer="Sorry, I Cannot help you with that request.",
+                meta=meta,
+            )
+            return
+
+        out_res = guard.last_result
+        meta["output"] = dict(out_res.meta or {})
+        if guard.pii_counts:
+            meta["output"]["pii_counts"] = guard.pii_counts
+        warned = "allow_with_warnings" in (in_res.decision, out_res.decision) or bool(guard.pii_counts)
+        yield _event(
+            "done",
+            decision="allow_with_warnings" if warned else "allow",
+            reason="; ".join(r for r in [in_res.reason, out_res.reason]),
+            meta=meta,
+        )
+
+    return _ClosingStreamingResponse(events(), on_close=stream.aclose, media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,147 @@
+""" Replay logged texts through the guardrail policy checks, in parallel.
+
+Input is JSONL, one record per line: a bare JSON string, or an object
+whose text is in --field. Without --field the first string among
+user_text / message / prompt / text / body / title is used, which covers
+the /chat request bodies and request logs like requests.jsonl.
+
+    python batch_audit.py requests.jsonl --direction input -o audit.jsonl
+    python batch_audit.py completions.jsonl --direction output --field completion --workers 8
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Literal, Optional, Union
+
+from guardrails import PolicyResult, policy_check_input, policy_check_output
+
+Direction = Literal["input", "output"]
+
+CHECKS: Dict[str, Callable[[str], PolicyResult]] = {
+    "input": policy_check_input,
+    "output": policy_check_output,
+}
+
+#Record fields tried in order when no field is given
+TEXT_FIELDS = ("user_text", "message", "prompt", "text", "body", "title")
+
+
+def _iter_records(lines: Iterable[str], field: Optional[str], source: str) -> Iterator[str]:
+    fields = (field,) if field else TEXT_FIELDS
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            yield record
+            continue
+        text = next((record[f] for f in fields if isinstance(record.get(f), str)), None) if isinstance(record, dict) else None
+        if text is None:
+            raise ValueError(f"{source}:{line_no} has no string field {' / '.join(fields)}")
+        yield text
+
+
+def iter_jsonl_texts(path: Union[str, Path], field: Optional[str] = None) -> Iterator[str]:
+    """ Stream texts from a JSONL file, one record per line, without loading the whole file.
+
+    A record is either a bare JSON string or an object holding the text under
+    `field`, or by default under the first of TEXT_FIELDS it has.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _iter_records(f, field, str(path))
+
+
+def _check_chunk(direction: str, texts: List[str]) -> List[PolicyResult]:
+    """ Worker side: run the single-call policy check over one chunk """
+    check = CHECKS[direction]
+    return [check(text) for text in texts]
+
+
+def _chunks(texts: Iterable[str], chunksize: int) -> Iterator[List[str]]:
+    it = iter(texts)
+    while True:
+        chunk = list(islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def policy_check_batch(
+    texts: Union[Iterable[str], str, Path],
+    direction: Direction = "input",
+    workers: Optional[int] = None,
+    chunksize: int = 256,
+    field: Optional[str] = None,
+) -> Iterator[PolicyResult]:
+    """ Run policy_check_input / policy_check_output over many texts.
+
+    texts is either an iterable of strings or the path of a JSONL file whose
+    records carry the text under `field` (default: the first of TEXT_FIELDS). Work is split into chunks and spread
+    over a process pool; results are streamed back in input order and are the
+    same PolicyResult objects the single-call API returns. workers=1 runs
+    in-process, workers=None uses one process per CPU. Only a bounded number
+    of chunks is in flight at once, so arbitrarily long inputs stream through.
+    Bad arguments raise ValueError here, not at the first result.
+    """
+    if direction not in CHECKS:
+        raise ValueError(f"direction must be 'input' or 'output', got {direction!r}")
+    if chunksize < 1:
+        raise ValueError("chunksize must be >= 1")
+    if isinstance(texts, (str, Path)):
+        texts = iter_jsonl_texts(texts, field=field)
+    return _check_batch(texts, direction, workers, chunksize)
+
+
+def _check_batch(texts: Iterable[str], direction: str, workers: Optional[int], chunksize: int) -> Iterator[PolicyResult]:
+    if workers == 1:
+        for chunk in _chunks(texts, chunksize):
+            yield from _check_chunk(direction, chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        max_in_flight = 2 * workers
+        pending: Deque[Future] = deque()
+        for chunk in _chunks(texts, chunksize):
+            pending.append(pool.submit(_check_chunk, direction, chunk))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay logged texts through the guardrail policy checks.")
+    parser.add_argument("input", help="JSONL file of texts ('-' reads stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file for PolicyResults (default: stdout)")
+    parser.add_argument("--direction", choices=sorted(CHECKS), default="input")
+    parser.add_argument("--field", default=None,
+                        help=f"record field holding the text (default: the first of {', '.join(TEXT_FIELDS)})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    texts: Union[Iterable[str], str] = (
+        _iter_records(sys.stdin, args.field, "<stdin>") if args.input == "-" else args.input
+    )
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in policy_check_batch(texts, args.direction, args.workers, args.chunksize, args.field):
+            out.write(result.model_dump_json())
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
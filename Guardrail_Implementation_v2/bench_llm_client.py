@@ -0,0 +1,97 @@
+""" Benchmark OllamaClient connection handling against the local stub server.
+
+"before" reproduces the old behaviour of opening a fresh httpx.AsyncClient
+for every call, "after" uses the pooled OllamaClient. Both run the same
+number of requests at the same concurrency and report requests/sec plus
+p50/p99 latency.
+
+    python bench_llm_client.py --requests 2000 --concurrency 50 --latency-ms 5
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from llm_client import OllamaClient
+from stub_ollama import StubServer
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "What is the capital of France?"},
+]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def _run(call: Callable[[], Awaitable[str]], requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with sem:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+async def bench_before(base_url: str, requests: int, concurrency: int) -> Dict[str, float]:
+    payload = {"model": "stub", "messages": MESSAGES, "stream": False}
+
+    async def call() -> str:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            resp = await client.post(f"{base_url}/api/chat", json=payload)
+            resp.raise_for_status()
+            return resp.json()["message"]["content"]
+
+    return await _run(call, requests, concurrency)
+
+
+async def bench_after(base_url: str, requests: int, concurrency: int) -> Dict[str, float]:
+    client = OllamaClient(base_url=base_url, model="stub")
+    await client.start()
+    try:
+        return await _run(lambda: client.chat(MESSAGES), requests, concurrency)
+    finally:
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub server latency per request")
+    args = parser.parse_args()
+
+    with StubServer(latency_ms=args.latency_ms) as url:
+        #Warm up the stub so both runs see a hot server
+        asyncio.run(bench_after(url, 50, 10))
+        results = {
+            "before (client per call)": asyncio.run(bench_before(url, args.requests, args.concurrency)),
+            "after (pooled client)": asyncio.run(bench_after(url, args.requests, args.concurrency)),
+        }
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, stub latency {args.latency_ms} ms")
+    print(f"{'':26} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:26} {r['rps']:9.1f} {r['p50_ms']:9.2f} {r['p99_ms']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
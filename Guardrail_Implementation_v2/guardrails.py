@@ -1,7 +1,11 @@
 from dataclasses import field,dataclass
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, Iterable, List, Mapping, Sequence, Set
 from pydantic import BaseModel, Field
+import functools
 import re
+from keyword_automaton import KeywordAutomaton
+from policy_cache import PolicyCache
+from regex_safety import RegexTimeout, arm_budget, check_patterns, compile_pattern, disarm_budget, re2_error, regex_engine_from_env, time_budget_from_env
 
 Decision = Literal["allow","allow_with_warnings","refuse","escalate"]
 
@@ -19,14 +23,18 @@ PROMPT_INJECTION_PATTERNS = [
     r"you are now (dan|developer mode|unrestricted mode|unrestrcited)",
     r"system prompt",
     r"developer mode",
-    r"reveal.*(policy|instruction|guardrail|hidden|ranking)",
+    #Was reveal.*(...), which rescanned the rest of the line from every "reveal"; the gap now stops at the
+    #next "reveal", so every character is scanned from one start and the same texts match
+    r"reveal(?:(?!reveal).)*?(policy|instruction|guardrail|hidden|ranking)",
     r"act as (the system| a system)",
     r"bypass|jailbreak|escape|circumvent|break free|break free from| break free from the|break out|break out of|go beyond"
 ]
 
+#The first two rules used to end in \s.*?(weapon|bomb|...|incendiary|), whose empty last alternative
+#made the object list optional; the lazy scan is gone but they match exactly the same texts
 DISALLOWED_INSTRUCTIONS = [
-    r"(make|build|create|develop|construct|craft|produce|manufacture)\s.*?(weapon|bomb|explosive|gun|knife|firearm|assault rifle|pistol|rifle|grenade|missile|rocket|chemical weapon|biological weapon|meth|drugs|virus|detonator|incendiary|)",
-    r"instructions?|tutorial|guide|recipe|blueprint\s.*?(weapon|bomb|explosive|gun|knife|firearm|assault rifle|pistol|rifle|grenade|missile|rocket|chemical weapon|biological weapon|meth|drugs|virus|detonator|incendiary|)",
+    r"(make|build|create|develop|construct|craft|produce|manufacture)\s",
+    r"instructions?|tutorial|guide|recipe|blueprint\s",
     r"suicide|self[-\s]?harm|kill yourself|end your life|take your life|hang yourself|overdose|shoot yourself|jump off"
 ]
 
@@ -66,11 +74,32 @@ TOXIC_KEYWORDS = [
     "mass shooting",
 ]
 
+#Per keyword weights used by toxicity_score_weighted, unlisted keywords weigh 1.0
+TOXIC_KEYWORD_WEIGHTS = {
+    "kill yourself": 3.0,
+    "harm yourself": 3.0,
+    "make a bomb": 3.0,
+    "mass shooting": 3.0,
+    "suicide": 2.0,
+    "how to hack": 2.0,
+    "explosives": 2.0,
+    "weapons": 2.0,
+    "nonsense": 0.5,
+    "sucks": 0.5,
+    "trash": 0.5,
+    "garbage": 0.5,
+    "fool": 0.5,
+    "dumb": 0.5,
+}
+TOXICITY_WEIGHT_SCALE = 3.0
+
 PII_PATTERNS = {
 
-    "email": r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b",
+    #Local part and domain capped at their RFC 5321 lengths: unbounded, "a.a.a..." restarted at every dot and rescanned the rest
+    "email": r"\b[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9.-]{1,255}\.[a-zA-Z]{2,}\b",
     "phone": r"\b\d{3}[-.\s]??\d{3}[-.\s]??\d{4}\b",
-    "credit_card": r"\b(?:\d[ -]*?){13,16}\b",
+    #13 to 16 digits, separators only between digits so the repeat has one way to split a run
+    "credit_card": r"\b\d(?:[ -]*\d){12,15}\b",
   #  "password": r"\b[a-zA-Z0-9!@#$%^&*()_+]{8,}\b",
     "pin": r"\b\d{4,6}\b",
     "passcode": r"\b\d{4,6}\b",
@@ -82,52 +111,364 @@ PII_PATTERNS = {
     "access token": r"\b[a-zA-Z0-9]{20,}\b"
 }
 
+#Rule categories
+INJECTION = "prompt_injection"
+DISALLOWED = "disallowed_instruction"
+TOXIC = "toxic_keyword"
+PII = "pii"
+ALL_CATEGORIES = (INJECTION, DISALLOWED, TOXIC, PII)
+
+#Shorter texts stay on the stdlib engine even when re2 is selected, see _RuleSet
+RE2_MIN_CHARS = 128
+
+@dataclass(frozen=True)
+class RuleHit:
+    """ A single rule match and its span in the scanned text """
+    category: str
+    rule: str
+    start: int
+    end: int
+
+@dataclass
+class ScanResult:
+    """ Every rule hit found by one GuardrailEngine.scan call """
+    text: str
+    hits: List[RuleHit] = field(default_factory=list)
+    #Keyword spans index into this lowercased copy of text
+    lowered: str = ""
+
+    def by_category(self, category: str) -> List[RuleHit]:
+        return [hit for hit in self.hits if hit.category == category]
+
+    def has(self, category: str) -> bool:
+        return any(hit.category == category for hit in self.hits)
+
+    def toxic_keywords(self) -> Set[str]:
+        """ Distinct toxic keywords present in the text """
+        return {hit.rule for hit in self.hits if hit.category == TOXIC}
+
+def dedupe_patterns(patterns: Mapping[str, str]) -> Dict[str, str]:
+    """ Drop labels whose regex repeats an earlier entry, keeping the first label """
+    first: Dict[str, str] = {}
+    for label, pattern in patterns.items():
+        first.setdefault(pattern, label)
+    return {label: pattern for pattern, label in first.items()}
+
+@dataclass
+class RedactionResult:
+    """ Redacted text plus the PII hits that were replaced (offsets into the original text) and per-label counts """
+    text: str
+    spans: List[RuleHit] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+def redact_spans(text: str, hits: Sequence[RuleHit]) -> RedactionResult:
+    """ Replace non-overlapping, position ordered PII hits and build the output in one join """
+    parts: List[str] = []
+    counts: Dict[str, int] = {}
+    pos = 0
+    for hit in hits:
+        parts.append(text[pos:hit.start])
+        parts.append(f"[REDACTED_{hit.rule.upper()}]")
+        counts[hit.rule] = counts.get(hit.rule, 0) + 1
+        pos = hit.end
+    parts.append(text[pos:])
+    return RedactionResult(text="".join(parts), spans=list(hits), counts=counts)
+
+class _RuleSet:
+    """ One rule category merged into a single alternation.
+
+    The merged regex uses plain non-capturing groups so the regex engine does
+    no group bookkeeping while scanning; the rule behind a hit is recovered
+    afterwards by re-matching the individual patterns at the hit offset.
+    Case-insensitive categories are matched against the lowercased text when
+    it is ASCII and the patterns have no uppercase characters, which avoids
+    the per-character case folding of re.IGNORECASE with identical results.
+
+    With engine="re2" the merged regex runs on RE2 for ASCII text of at
+    least RE2_MIN_CHARS, which is linear in the text; below that the call
+    overhead of the re2 module outweighs the scan and the stdlib engine's
+    worst case is small. Non-ASCII text stays on the stdlib engine because
+    RE2's digit, word and word boundary classes are ASCII-only, and so does
+    a category RE2 cannot compile. The per-hit rule lookup always uses the
+    stdlib patterns: the re2 module re-encodes the whole text on every call,
+    and an anchored match at a known hit is cheap once the linter has ruled
+    out exponential patterns.
+    """
+
+    def __init__(self, category: str, patterns: Sequence[str], rules: Sequence[str], ignore_case: bool, engine: str = "re"):
+        self.category = category
+        self.rules = list(rules)
+        flags = re.IGNORECASE if ignore_case else 0
+        merged = "|".join(f"(?:{pattern})" for pattern in patterns)
+        self.regex = re.compile(merged, flags)
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+        self.lower_fast_path = ignore_case and all(pattern == pattern.lower() for pattern in patterns)
+        if self.lower_fast_path:
+            self.lower_regex = re.compile(merged)
+            self.lower_patterns = [re.compile(pattern) for pattern in patterns]
+        self.linear = False
+        if engine == "re2":
+            try:
+                self.linear_regex = compile_pattern(merged, ignore_case and not self.lower_fast_path, engine)
+                self.linear = True
+            except re2_error():
+                pass
+
+    def scan(self, text: str, lowered: Optional[str], linear: bool = False) -> List[RuleHit]:
+        """ lowered is the lowercased text when the text is ASCII, None otherwise; linear selects RE2 for it """
+        if self.lower_fast_path and lowered is not None:
+            regex, patterns, subject = self.lower_regex, self.lower_patterns, lowered
+            if linear:
+                regex = self.linear_regex
+        elif linear and lowered is not None:
+            regex, patterns, subject = self.linear_regex, self.patterns, text
+        else:
+            regex, patterns, subject = self.regex, self.patterns, text
+        hits = []
+        for m in regex.finditer(subject):
+            start, end = m.span()
+            #The merged regex picks the first alternative that matches at start
+            for rule, pattern in zip(self.rules, patterns):
+                if pattern.match(subject, start):
+                    hits.append(RuleHit(self.category, rule, start, end))
+                    break
+        return hits
+
+class GuardrailEngine:
+    """ Precompiled guardrail rules.
+
+    Each regex category is merged into a single alternation so the text is
+    walked once per category instead of once per pattern, and the toxic
+    keywords are matched by an Aho-Corasick automaton in one linear pass.
+    A regex category reports the leftmost non-overlapping hits, which is
+    exactly what the "does any pattern match" decisions need; keyword hits
+    include overlapping keywords so the toxicity score keeps counting every
+    distinct keyword present.
+
+    Every pattern is linted when the engine is built (regex_safety), so a
+    rule that can backtrack exponentially fails at startup. With the re2
+    engine, every category RE2 can compile runs on it for long ASCII text.
+    Scans that touch the stdlib engine are held to time_budget seconds and
+    raise RegexTimeout past it; the policy checks turn that into a refusal.
+    """
+
+    def __init__(
+        self,
+        injection_patterns: Sequence[str],
+        disallowed_patterns: Sequence[str],
+        toxic_keywords: Iterable[str],
+        pii_patterns: Mapping[str, str],
+        toxic_keyword_weights: Optional[Mapping[str, float]] = None,
+        engine: str = "re",
+        time_budget: Optional[float] = None,
+    ):
+        pii_rules = dedupe_patterns(pii_patterns)
+        #Raises UnsafePatternError for exponential patterns
+        self.lint_findings = {
+            INJECTION: check_patterns(injection_patterns, ignore_case=True),
+            DISALLOWED: check_patterns(disallowed_patterns, ignore_case=True),
+            PII: check_patterns(list(pii_rules.values())),
+        }
+        self._rulesets = {
+            INJECTION: _RuleSet(INJECTION, injection_patterns, injection_patterns, ignore_case=True, engine=engine),
+            DISALLOWED: _RuleSet(DISALLOWED, disallowed_patterns, disallowed_patterns, ignore_case=True, engine=engine),
+            #PII hits are reported by label rather than by pattern source
+            PII: _RuleSet(PII, list(pii_rules.values()), list(pii_rules.keys()), ignore_case=False, engine=engine),
+        }
+        self.keywords = KeywordAutomaton(toxic_keywords, toxic_keyword_weights)
+        self.engine = engine
+        self.time_budget = time_budget
+        #Computed once here, the policy cache compares it on every lookup
+        self.version = hash((
+            tuple(injection_patterns),
+            tuple(disallowed_patterns),
+            tuple(self.keywords.keywords),
+            tuple(pii_rules.items()),
+            tuple(sorted((toxic_keyword_weights or {}).items())),
+        ))
+
+    @classmethod
+    def from_defaults(cls) -> "GuardrailEngine":
+        """ Default rules; GUARDRAIL_REGEX_ENGINE and GUARDRAIL_REGEX_BUDGET_MS pick the engine and budget """
+        return cls(
+            PROMPT_INJECTION_PATTERNS, DISALLOWED_INSTRUCTIONS, TOXIC_KEYWORDS, PII_PATTERNS,
+            toxic_keyword_weights=TOXIC_KEYWORD_WEIGHTS,
+            engine=regex_engine_from_env(),
+            time_budget=time_budget_from_env(),
+        )
+
+    def scan(self, text: str, categories: Iterable[str] = ALL_CATEGORIES) -> ScanResult:
+        """ Scan text once for the requested rule categories """
+        #Lowercased once and shared by the keyword scan and the case-insensitive fast path
+        lowered = text.lower()
+        ascii_lowered = lowered if text.isascii() else None
+        result = ScanResult(text=text, lowered=lowered)
+        rulesets = [self._rulesets[category] for category in categories if category != TOXIC]
+        #RE2 scans are linear, only the stdlib engine needs the budget
+        use_re2 = ascii_lowered is not None and len(text) >= RE2_MIN_CHARS
+        armed = not all(use_re2 and ruleset.linear for ruleset in rulesets) and arm_budget(self.time_budget)
+        try:
+            for ruleset in rulesets:
+                result.hits.extend(ruleset.scan(text, ascii_lowered, use_re2 and ruleset.linear))
+        finally:
+            if armed:
+                disarm_budget()
+        if TOXIC in categories:
+            #Keywords are matched against the lowercased text, as toxicity_score_cheap always did
+            result.hits.extend(
+                RuleHit(TOXIC, keyword, start, end) for start, end, keyword in self.keywords.iter_matches(lowered)
+            )
+        return result
+
+    def toxicity_weighted(self, scan: ScanResult, word_boundary: bool = True, scale: float = TOXICITY_WEIGHT_SCALE) -> float:
+        """ Weighted toxicity from the keyword hits of a scan, counting every occurrence """
+        total = 0.0
+        for hit in scan.by_category(TOXIC):
+            if word_boundary and not KeywordAutomaton.is_word_bounded(scan.lowered, hit.start, hit.end):
+                continue
+            total += self.keywords.weight(hit.rule)
+        return min(1.0, total / scale)
+
+def ruleset_version() -> int:
+    """ Fingerprint of the rule lists the shared engine was built from """
+    return ENGINE.version
+
+ENGINE = GuardrailEngine.from_defaults()
+
+def get_engine() -> GuardrailEngine:
+    """ The shared engine, rebuilt only by reload_rules() """
+    return ENGINE
+
+def reload_rules() -> GuardrailEngine:
+    """ Rebuild the shared engine after editing the rule lists.
+
+    The cached decisions are tied to the old version and are dropped on the
+    next lookup.
+    """
+    global ENGINE
+    ENGINE = GuardrailEngine.from_defaults()
+    return ENGINE
+
+#Decision cache, off unless configure_policy_cache() is called
+POLICY_CACHE: Optional[PolicyCache] = None
+
+def configure_policy_cache(
+    max_entries: int = 10_000,
+    max_bytes: int = 64 * 1024 * 1024,
+    ttl_seconds: Optional[float] = 300.0,
+) -> PolicyCache:
+    """ Turn on caching of policy_check_input / policy_check_output results """
+    global POLICY_CACHE
+    POLICY_CACHE = PolicyCache(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+    return POLICY_CACHE
+
+def disable_policy_cache() -> None:
+    global POLICY_CACHE
+    POLICY_CACHE = None
+
+def _cached_policy(direction: str):
+    """ Serve a policy check from POLICY_CACHE when it is enabled """
+    def wrap(check):
+        @functools.wraps(check)
+        def wrapper(text: str) -> PolicyResult:
+            cache = POLICY_CACHE
+            if cache is None:
+                return check(text)
+            version = ENGINE.version
+            result = cache.get(direction, text, version)
+            if result is None:
+                result = check(text)
+                #A timeout can come from a load spike as much as from the text, so it is not remembered
+                if (result.meta or {}).get("rule") != TIME_BUDGET_RULE:
+                    cache.put(direction, text, version, result)
+            return result
+        return wrapper
+    return wrap
+
+TIME_BUDGET_RULE = "time_budget"
+
+def _time_budget_refusal(policy: str) -> PolicyResult:
+    """ Fail closed when the rules could not finish scanning the text in time """
+    return PolicyResult(
+        decision="refuse",
+        reason=f"Guardrail {policy} check exceeded its time budget",
+        meta={"policy":policy,"rule":TIME_BUDGET_RULE}
+    )
+
 #Detection Function
 
 def contains_prompt_injection(text: str) -> bool:
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in PROMPT_INJECTION_PATTERNS)    
+    try:
+        return get_engine().scan(text, (INJECTION,)).has(INJECTION)
+    except RegexTimeout:
+        return True
 
 def contains_disallowed_instruction(text: str) -> bool:
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in DISALLOWED_INSTRUCTIONS) 
+    try:
+        return get_engine().scan(text, (DISALLOWED,)).has(DISALLOWED)
+    except RegexTimeout:
+        return True
+
+def _toxicity_from_scan(scan: ScanResult) -> float:
+    return min(1.0, len(scan.toxic_keywords()) / 3.0)
 
 def toxicity_score_cheap(text: str) -> float:
     """ Cheap and simple toxicity score check, not ML based just simple keyword matching """
-    t = text.lower()
-    hits = sum(1 for keyword in TOXIC_KEYWORDS if keyword in t)
-    return  min(1.0,hits /3.0)
+    return _toxicity_from_scan(get_engine().scan(text, (TOXIC,)))
+
+def toxicity_score_weighted(text: str, word_boundary: bool = True) -> float:
+    """ Keyword toxicity score using TOXIC_KEYWORD_WEIGHTS and whole-word matches """
+    engine = get_engine()
+    return engine.toxicity_weighted(engine.scan(text, (TOXIC,)), word_boundary=word_boundary)
+
+def redact_pii_with_spans(text: str) -> RedactionResult:
+    """ Redact PII in a single scan.
+
+    Duplicate patterns are collapsed onto their first label and all PII
+    patterns are matched in one pass, so overlaps are settled by position:
+    the leftmost match wins and, for matches starting at the same offset,
+    the label listed first in PII_PATTERNS wins. Text that cannot be
+    scanned within the time budget is redacted as a whole.
+    """
+    try:
+        hits = get_engine().scan(text, (PII,)).by_category(PII)
+    except RegexTimeout:
+        hits = [RuleHit(PII, TIME_BUDGET_RULE, 0, len(text))]
+    return redact_spans(text, hits)
 
 def redact_pii(text: str) -> str:
-    redacted_text = text
-    for label,pattern in PII_PATTERNS.items():
-        redacted_text = re.sub(pattern, f"[REDACTED_{label.upper()}]", redacted_text)
-    return redacted_text
+    return redact_pii_with_spans(text).text
 
+@_cached_policy("input")
 def policy_check_input(user_text: str) -> PolicyResult:
     """ Policy check for user input """
     meta: Dict[str, Any] = {}
+    try:
+        scan = get_engine().scan(user_text, (INJECTION, DISALLOWED, PII))
+    except RegexTimeout:
+        return _time_budget_refusal("input")
     
-    if contains_prompt_injection(user_text):
+    if scan.has(INJECTION):
         return PolicyResult(
             decision="refuse",
             reason="Prompt Injection detected in user input",
             meta={"policy":"input","rule":"prompt_injection"}
         )
     
-    if contains_disallowed_instruction(user_text):
+    if scan.has(DISALLOWED):
         return PolicyResult(
             decision="refuse",
             reason="Disallowed instruction detected in user input",
             meta={"policy":"input","rule":"disallowed_instruction"}
         )
     
-    sanitized_text = redact_pii(user_text)
-    if sanitized_text != user_text:
-        
+    if scan.has(PII):
+        redaction = redact_spans(user_text, scan.by_category(PII))
         return PolicyResult(
             decision="allow_with_warnings",
             reason="PII detected and redacted in user input",
-            sanitized_text=sanitized_text,
-            meta={"policy":"input","rule":"pii_redaction", "pii_redacted": True}
+            sanitized_text=redaction.text,
+            meta={"policy":"input","rule":"pii_redaction", "pii_redacted": True, "pii_counts": redaction.counts}
         )
     
     return PolicyResult(
@@ -136,12 +477,18 @@ def policy_check_input(user_text: str) -> PolicyResult:
         meta={"policy":"input","rule":"none"}
     )
     
+@_cached_policy("output")
 def policy_check_output(model_text: str) -> PolicyResult:
     """ Policy check for model output """
     meta: Dict[str, Any] = {}
+    engine = get_engine()
+    try:
+        scan = engine.scan(model_text, (DISALLOWED, TOXIC, PII))
+    except RegexTimeout:
+        return _time_budget_refusal("output")
     
     #Disallowed instruction check
-    if contains_disallowed_instruction(model_text):
+    if scan.has(DISALLOWED):
         return PolicyResult(
             decision="refuse",
             reason="Disallowed instruction detected in model output",
@@ -149,32 +496,142 @@ def policy_check_output(model_text: str) -> PolicyResult:
         )
     
     #Toxicity check
-    toxicity = toxicity_score_cheap(model_text)
+    toxicity = _toxicity_from_scan(scan)
     meta["toxicity_score"] = toxicity
     if toxicity >= 0.60:
+        #Weighted whole-word score is reported next to the default one for comparison
+        weighted = engine.toxicity_weighted(scan)
         return PolicyResult(
             decision="refuse",
             reason=f"Toxic score {toxicity:.2f} in model output",
-            meta={"policy":"output","rule":"toxicity_check","toxicity_score":toxicity}
+            meta={"policy":"output","rule":"toxicity_check","toxicity_score":toxicity,"toxicity_score_weighted":weighted}
         )
     elif toxicity >= 0.30:
+        weighted = engine.toxicity_weighted(scan)
         return PolicyResult(
             decision="allow_with_warnings",
             reason=f"Toxic score {toxicity:.2f} in model output, Mild Toxicity warning",
-            meta={"policy":"output","rule":"toxicity_check","toxicity_score":toxicity}
+            meta={"policy":"output","rule":"toxicity_check","toxicity_score":toxicity,"toxicity_score_weighted":weighted}
         )
     
     #PII Redaction
-    sanitized_text = redact_pii(model_text)
-    if sanitized_text != model_text:
+    if scan.has(PII):
+        redaction = redact_spans(model_text, scan.by_category(PII))
         return PolicyResult(
             decision="allow_with_warnings",
             reason="PII detected and redacted in model output",
-            sanitized_text=sanitized_text,
-            meta={"policy":"output","rule":"pii_redaction", "pii_redacted": True}
+            sanitized_text=redaction.text,
+            meta={"policy":"output","rule":"pii_redaction", "pii_redacted": True, "pii_counts": redaction.counts}
         )
     return PolicyResult(
         decision="allow",
         reason="Output is OK",
         meta={"policy":"output","rule":"none"}
-    )
\ No newline at end of file
+    )
+
+#Same check without the decision cache (functools.wraps keeps the undecorated function)
+_check_output_uncached = policy_check_output.__wrapped__
+
+#The rewording /chat applies to an answer that passed with warnings
+SOFTENED_PHRASES = (("You are", "It seems"), ("stupid", "confused"))
+
+def soften(text: str) -> str:
+    for phrase, replacement in SOFTENED_PHRASES:
+        text = text.replace(phrase, replacement)
+    return text
+
+class StreamingOutputGuard:
+    """ Incremental policy_check_output for a completion that arrives in chunks.
+
+    Every chunk re-runs policy_check_output over a sliding window of the most
+    recent text, so the cost per chunk stays bounded by the window size and a
+    refusal is raised as soon as it shows up. Text is only released once it
+    sits at least holdback_chars behind the newest token and ends on
+    whitespace outside any PII match, so a PII value split across chunks is
+    always redacted before it is flushed. With soften=True released text is
+    reworded like /chat whenever the latest check allowed it with warnings,
+    and never cut inside a softened phrase.
+    """
+
+    def __init__(self, window_chars: int = 512, holdback_chars: int = 64, soften: bool = False):
+        self.window_chars = window_chars
+        self.holdback_chars = holdback_chars
+        self.soften = soften
+        self.refusal: Optional[PolicyResult] = None
+        self.last_result: Optional[PolicyResult] = None
+        self.pii_counts: Dict[str, int] = {}
+        self._parts: List[str] = []
+        self._pending = ""
+        self._flushed_tail = ""
+
+    @property
+    def text(self) -> str:
+        """ Raw (unredacted) text received so far """
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        """ Add a chunk and return the redacted text that is safe to send now.
+
+        Returns "" while holding text back; check `refusal` after each call.
+        """
+        if self.refusal is not None:
+            return ""
+        self._parts.append(chunk)
+        self._pending += chunk
+        window = (self._flushed_tail + self._pending)[-self.window_chars:]
+        #Windows are almost never repeated, caching them would only churn the LRU
+        self.last_result = _check_output_uncached(window)
+        if self.last_result.decision == "refuse":
+            self.refusal = self.last_result
+            return ""
+        return self._flush(final=False)
+
+    def finish(self) -> str:
+        """ Check the full completion and release whatever is still held back """
+        if self.refusal is not None:
+            return ""
+        self.last_result = _check_output_uncached(self.text)
+        if self.last_result.decision == "refuse":
+            self.refusal = self.last_result
+            return ""
+        return self._flush(final=True)
+
+    def _flush(self, final: bool) -> str:
+        pending = self._pending
+        if final:
+            cut = len(pending)
+        else:
+            limit = len(pending) - self.holdback_chars
+            if limit <= 0:
+                return ""
+            cut = limit
+            while cut > 0 and not pending[cut - 1].isspace():
+                cut -= 1
+            if cut == 0 and len(pending) > self.window_chars:
+                #A single very long token: cut inside it rather than buffering forever
+                cut = limit
+        try:
+            hits = get_engine().scan(pending, (PII,)).by_category(PII)
+        except RegexTimeout:
+            self.refusal = _time_budget_refusal("output")
+            return ""
+        spans = [(hit.start, hit.end) for hit in hits]
+        if self.soften:
+            spans += [(m.start(), m.end()) for phrase, _ in SOFTENED_PHRASES for m in re.finditer(re.escape(phrase), pending)]
+        #Moving the cut back to one span's start can land it inside another
+        moved = True
+        while moved:
+            moved = False
+            for start, end in spans:
+                if start < cut < end:
+                    cut, moved = start, True
+        if cut == 0:
+            return ""
+        redaction = redact_spans(pending[:cut], [hit for hit in hits if hit.end <= cut])
+        for label, n in redaction.counts.items():
+            self.pii_counts[label] = self.pii_counts.get(label, 0) + n
+        self._flushed_tail = (self._flushed_tail + pending[:cut])[-self.window_chars:]
+        self._pending = pending[cut:]
+        if self.soften and self.last_result is not None and self.last_result.decision == "allow_with_warnings":
+            return soften(redaction.text)
+        return redaction.text
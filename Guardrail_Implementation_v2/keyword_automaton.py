@@ -0,0 +1,90 @@
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """ Aho-Corasick automaton over a fixed keyword list.
+
+    The automaton is built once from the keyword list and then finds every
+    keyword occurrence, overlapping ones included, in a single left to right
+    pass over the text. The cost of a scan is linear in the text length plus
+    the number of hits, no matter how many keywords are loaded.
+    """
+
+    def __init__(self, keywords: Iterable[str], weights: Optional[Mapping[str, float]] = None, default_weight: float = 1.0):
+        self.weights: Dict[str, float] = dict(weights or {})
+        self.default_weight = default_weight
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self.keywords: List[str] = []
+        for keyword in dict.fromkeys(keywords):
+            if keyword:
+                self._add(keyword)
+        self._link()
+        #Resolved transitions, filled lazily so each (state, ASCII char) pair walks the failure chain at most once.
+        #Other characters are resolved every time, so untrusted Unicode text cannot grow the table without bound
+        self._delta: List[Dict[str, int]] = [dict(edges) for edges in self._goto]
+
+    def _add(self, keyword: str) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (keyword,)
+        self.keywords.append(keyword)
+
+    def _link(self) -> None:
+        """ Breadth first pass computing failure links and merged outputs """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _resolve(self, state: int, ch: str) -> int:
+        start = state
+        while state and ch not in self._goto[state]:
+            state = self._fail[state]
+        nxt = self._goto[state].get(ch, 0)
+        if ch < "\x80":
+            self._delta[start][ch] = nxt
+        return nxt
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """ Yield (start, end, keyword) for every keyword occurrence in text """
+        delta, out, resolve = self._delta, self._out, self._resolve
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = delta[state].get(ch)
+            state = resolve(state, ch) if nxt is None else nxt
+            if out[state]:
+                end = i + 1
+                for keyword in out[state]:
+                    yield end - len(keyword), end, keyword
+
+    @staticmethod
+    def is_word_bounded(text: str, start: int, end: int) -> bool:
+        """ True when the span is not glued to a letter, digit or underscore on either side """
+        before = start == 0 or not (text[start - 1].isalnum() or text[start - 1] == "_")
+        after = end >= len(text) or not (text[end].isalnum() or text[end] == "_")
+        return before and after
+
+    def weight(self, keyword: str) -> float:
+        return self.weights.get(keyword, self.default_weight)
@@ -1,32 +1,140 @@
 from __future__ import annotations
+import asyncio
+import json
+from contextlib import asynccontextmanager
 import httpx
-from typing import List, Any,Dict,Optional
+from typing import List, Any,AsyncIterator,Dict,Optional
+
+try:
+    import h2  # noqa: F401  httpx only negotiates HTTP/2 when the h2 package is installed
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class LLMBusyError(Exception):
+    """ No generation slot became free within queue_timeout """
 
 
 class OllamaClient:
-    """ A client for interacting with a Language Model (LLM) API."""
+    """ A client for interacting with a Language Model (LLM) API.
+
+    The client owns one long-lived httpx.AsyncClient so TCP connections are
+    kept alive and reused across requests. Call start() / aclose() from the
+    application lifespan; chat() also starts the pool lazily if needed.
+    """
 #    def __init__(self, base_url: str="http://localhost:11434", model: str="gemma3:1b"):
-    def __init__(self, base_url: str="http://localhost:11434", model: str="sadiq-bd/llama3.2-1b-uncensored:latest"):
+    def __init__(
+        self,
+        base_url: str="http://localhost:11434",
+        model: str="sadiq-bd/llama3.2-1b-uncensored:latest",
+        timeout: float=60.0,
+        max_connections: int=100,
+        max_keepalive_connections: int=20,
+        keepalive_expiry: float=30.0,
+        http2: bool=True,
+        max_in_flight: Optional[int]=None,
+        queue_timeout: float=10.0,
+    ):
         self.base_url = base_url
         self.model = model
         self.headers = {
             "Content-Type": "application/json"
         }
-    
-    async def chat(self, message: List[Dict[str, str]], max_tokens: int=512, temperature: float=0.7) -> str:
-        """ Send a chat message to the LLM and get the response. """
-        payload:Dict[str,any] = {
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        #HTTP/2 is negotiated via ALPN, so it only kicks in for https servers that offer it
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client: Optional[httpx.AsyncClient] = None
+        #Optional cap on concurrent generations, a single Ollama box degrades badly when oversubscribed
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self.queue_timeout = queue_timeout
+
+    async def start(self) -> None:
+        """ Open the shared connection pool """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+
+    async def aclose(self) -> None:
+        """ Close the shared connection pool """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+
+    @asynccontextmanager
+    async def _generation_slot(self):
+        if self._slots is None:
+            yield
+            return
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMBusyError("Timed out waiting for a free LLM slot") from None
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _payload(self, message: List[Dict[str, str]], max_tokens: int, temperature: float, stream: bool) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": message,
             "max_tokens": max_tokens,
             "options": {
                 "temperature": temperature
             },
-            "stream": False
+            "stream": stream
         }
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-           resp = await client.post(f"{self.base_url}/api/chat",json=payload)
-           resp.raise_for_status()
-           data = resp.json()
-           return data["message"]["content"]
\ No newline at end of file
+
+    async def chat(self, message: List[Dict[str, str]], max_tokens: int=512, temperature: float=0.7) -> str:
+        """ Send a chat message to the LLM and get the response. """
+        payload = self._payload(message, max_tokens, temperature, stream=False)
+
+        client = await self._http()
+        async with self._generation_slot():
+            resp = await client.post("/api/chat", json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+        return data["message"]["content"]
+
+    async def chat_stream(self, message: List[Dict[str, str]], max_tokens: int=512, temperature: float=0.7) -> AsyncIterator[str]:
+        """ Send a chat message and yield the response text as the model generates it.
+
+        Closing the generator early closes the upstream response, which makes
+        Ollama stop generating the rest of the completion.
+
+        The generation slot is taken when the first chunk is requested and
+        held until the generator finishes or is closed, so LLMBusyError comes
+        out of that first __anext__(). Callers that answer over HTTP pull the
+        first chunk before sending headers so the error can still become a 503.
+        """
+        payload = self._payload(message, max_tokens, temperature, stream=True)
+
+        client = await self._http()
+        async with self._generation_slot():
+            async with client.stream("POST", "/api/chat", json=payload) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        break
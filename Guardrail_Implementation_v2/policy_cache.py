@@ -0,0 +1,122 @@
+from __future__ import annotations
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def text_key(direction: str, text: str) -> bytes:
+    """ Fixed size cache key for a text, so long prompts do not inflate the cache """
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16, person=direction.encode()[:16])
+    return digest.digest()
+
+
+def _result_size(result: Any) -> int:
+    """ Rough resident size of a cached PolicyResult """
+    size = 256
+    for value in (result.reason, result.sanitized_text):
+        if value is not None:
+            size += sys.getsizeof(value)
+    if result.meta:
+        size += 64 * len(result.meta)
+    return size
+
+
+class PolicyCache:
+    """ Bounded LRU + TTL cache of PolicyResults.
+
+    Entries are keyed by a hash of the exact text and the check direction and
+    are tied to a rule-set version: as soon as a lookup comes in with a
+    different version the whole cache is dropped, so edits to the pattern
+    lists can never serve a stale decision. The cache is bounded both by
+    entry count and by an approximate memory ceiling in bytes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, direction: str, text: str, version: Hashable) -> Optional[Any]:
+        key = text_key(direction, text)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, result = entry
+            if expires_at < self._clock():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        #Callers get their own copy so mutating meta cannot corrupt the cache
+        return result.model_copy(deep=True)
+
+    def put(self, direction: str, text: str, version: Hashable, result: Any) -> None:
+        key = text_key(direction, text)
+        size = _result_size(result) + len(key)
+        if size > self.max_bytes:
+            return
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        stored = result.model_copy(deep=True)
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires_at, size, stored)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,442 @@
+""" ReDoS protection for the guardrail rules.
+
+Three layers, all used by GuardrailEngine:
+
+- lint_pattern / check_patterns: a static check run when the rules are
+  compiled. Patterns whose backtracking can blow up exponentially (an
+  ambiguous repeat nested in another repeat, like "(a+)+" or "(\\w+\\s?)*")
+  are rejected with UnsafePatternError; quadratic ones (a greedy ".*"
+  followed by something it can also match) are reported as findings.
+- compile_pattern: RE2 (the optional google-re2 package) runs in time
+  linear in the text, so it is used for ASCII text when installed.
+- time_budget: a hard wall-clock budget for the stdlib engine. The regex
+  engine polls for signals while it backtracks, so a SIGALRM handler that
+  raises RegexTimeout stops a runaway match; callers turn that into a
+  refusal. Signals are only delivered to the main thread, so the budget is
+  a no-op in other threads and on platforms without setitimer; those scans
+  are counted (unarmed_budget_count) and logged once.
+
+    python regex_safety.py    # lint the default guardrail rules
+"""
+from __future__ import annotations
+import logging
+import os
+import re
+import signal
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  #Python < 3.11
+    import sre_constants
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+REGEX_ENGINES = ("auto", "re", "re2")
+DEFAULT_BUDGET_MS = 100.0
+
+EXPONENTIAL = "exponential"
+POLYNOMIAL = "polynomial"
+
+#Every ASCII character plus a few non-ASCII ones for the Unicode aware classes
+_ALPHABET = frozenset(map(chr, range(128))) | frozenset("\u00e9\u00df\u0663\u00a0\u2028")
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_POSSESSIVE_REPEAT = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+_ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+
+
+def _char_class(predicate) -> FrozenSet[str]:
+    return frozenset(c for c in _ALPHABET if predicate(c))
+
+
+_DIGIT = _char_class(str.isdecimal)
+_SPACE = _char_class(str.isspace)
+_WORD = _char_class(lambda c: c.isalnum() or c == "_")
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: _DIGIT,
+    sre_constants.CATEGORY_NOT_DIGIT: _ALPHABET - _DIGIT,
+    sre_constants.CATEGORY_SPACE: _SPACE,
+    sre_constants.CATEGORY_NOT_SPACE: _ALPHABET - _SPACE,
+    sre_constants.CATEGORY_WORD: _WORD,
+    sre_constants.CATEGORY_NOT_WORD: _ALPHABET - _WORD,
+}
+
+
+class UnsafePatternError(ValueError):
+    """ Raised when a rule pattern can backtrack exponentially """
+
+    def __init__(self, findings: Sequence["LintFinding"]):
+        self.findings = list(findings)
+        super().__init__("; ".join(f"{f.pattern!r}: {f.message}" for f in self.findings))
+
+
+class RegexTimeout(RuntimeError):
+    """ A regex scan ran past its time budget """
+
+
+@dataclass(frozen=True)
+class LintFinding:
+    pattern: str
+    severity: str
+    message: str
+
+
+class _Linter:
+    """ Approximate first-character analysis over the sre parse tree.
+
+    A variable-length repeat is ambiguous when a character it can consume
+    could also start whatever follows it, because the engine can then split
+    the same text between the two in several ways. Inside a repeat that
+    iterates, every iteration multiplies those splits (exponential); at the
+    top level an unbounded repeat re-scans the rest of the text from each
+    start position (polynomial), while a bounded one like "[^.]{0,80}" or
+    a plain alternation only costs a constant factor per position and is
+    not reported, and neither is a tempered token right after the literal
+    the pattern starts with, "abc(?:(?!abc).)*": it stops at the next
+    start, so every character is scanned from one start only. Alternatives
+    of a branch that iterates are ambiguous the same way when their first
+    characters overlap, or when more than one can match empty, which is
+    what duplicate alternatives like "(a|a)" become once the parser has
+    factored out their common prefix. Character sets are evaluated over a small sample
+    alphabet, so the check errs towards reporting.
+    """
+
+    def __init__(self, pattern: str, ignore_case: bool):
+        self.pattern = pattern
+        self.ignore_case = ignore_case
+        self.findings: List[LintFinding] = []
+
+    def run(self) -> List[LintFinding]:
+        flags = re.IGNORECASE if self.ignore_case else 0
+        self._walk(list(sre_parse.parse(self.pattern, flags)), frozenset(), iterating=False, top=True)
+        return self.findings
+
+    def _report(self, severity: str, message: str) -> None:
+        finding = LintFinding(self.pattern, severity, message)
+        if finding not in self.findings:
+            self.findings.append(finding)
+
+    def _fold(self, chars: FrozenSet[str]) -> FrozenSet[str]:
+        if not self.ignore_case:
+            return chars
+        return chars | frozenset(c.lower() for c in chars) | frozenset(c.upper() for c in chars)
+
+    def _chars(self, op, av) -> FrozenSet[str]:
+        """ Characters a single-character node matches """
+        if op is sre_constants.LITERAL:
+            return self._fold(frozenset(chr(av)))
+        if op is sre_constants.NOT_LITERAL:
+            return _ALPHABET - self._fold(frozenset(chr(av)))
+        if op is sre_constants.ANY:
+            return _ALPHABET - {"\n"}
+        chars: FrozenSet[str] = frozenset()
+        negate = False
+        for item_op, item in av:
+            if item_op is sre_constants.NEGATE:
+                negate = True
+            elif item_op is sre_constants.LITERAL:
+                chars |= frozenset(chr(item))
+            elif item_op is sre_constants.RANGE:
+                chars |= frozenset(c for c in _ALPHABET if item[0] <= ord(c) <= item[1])
+            elif item_op is sre_constants.CATEGORY:
+                chars |= _CATEGORIES.get(item, _ALPHABET)
+            else:
+                chars = _ALPHABET
+        chars = self._fold(chars)
+        return _ALPHABET - chars if negate else chars
+
+    def _first(self, nodes) -> Tuple[FrozenSet[str], bool]:
+        """ Characters that can start a match of nodes, and whether nodes can match empty """
+        chars: FrozenSet[str] = frozenset()
+        for op, av in nodes:
+            node_chars, nullable = self._node_first(op, av)
+            chars |= node_chars
+            if not nullable:
+                return chars, False
+        return chars, True
+
+    def _node_first(self, op, av) -> Tuple[FrozenSet[str], bool]:
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+            return self._chars(op, av), False
+        if op is sre_constants.BRANCH:
+            firsts = [self._first(alt) for alt in av[1]]
+            return frozenset().union(*(c for c, _ in firsts)), any(n for _, n in firsts)
+        if op is sre_constants.SUBPATTERN:
+            return self._first(av[-1])
+        if op is _ATOMIC_GROUP:
+            return self._first(av)
+        if op in _REPEATS or op is _POSSESSIVE_REPEAT:
+            chars, nullable = self._first(av[2])
+            return chars, nullable or av[0] == 0
+        if op in _ZERO_WIDTH:
+            return frozenset(), True
+        #Backreferences and conditionals: assume anything
+        return _ALPHABET, True
+
+    def _consumable(self, nodes) -> FrozenSet[str]:
+        """ Every character some part of nodes can consume """
+        chars: FrozenSet[str] = frozenset()
+        for op, av in nodes:
+            if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+                chars |= self._chars(op, av)
+            elif op is sre_constants.BRANCH:
+                for alt in av[1]:
+                    chars |= self._consumable(alt)
+            elif op is sre_constants.SUBPATTERN:
+                chars |= self._consumable(av[-1])
+            elif op is _ATOMIC_GROUP:
+                chars |= self._consumable(av)
+            elif op in _REPEATS or op is _POSSESSIVE_REPEAT:
+                chars |= self._consumable(av[2])
+            elif op not in _ZERO_WIDTH:
+                chars |= _ALPHABET
+        return chars
+
+    def _check_overlap(self, construct: str, chars: FrozenSet[str], after: FrozenSet[str], iterating: bool) -> None:
+        overlap = chars & after
+        if not overlap:
+            return
+        #Lowercase letters first, they read best in the message
+        sample = "".join(sorted(overlap, key=lambda c: (c.isupper(), c))[:5])
+        if iterating:
+            self._report(EXPONENTIAL, f"nested quantifier: {construct} and what follows it both match {sample!r}")
+        else:
+            self._report(POLYNOMIAL, f"{construct} and what follows it both match {sample!r}")
+
+    @staticmethod
+    def _tempered(prefix, body) -> bool:
+        """ The repeat body refuses to run into another copy of the literal prefix before it """
+        literals = [node for node in prefix if node[0] is not sre_constants.AT]
+        if not literals or any(op is not sre_constants.LITERAL for op, _ in literals):
+            return False
+        body = list(body)
+        if not body or body[0][0] is not sre_constants.ASSERT_NOT:
+            return False
+        direction, lookahead = body[0][1]
+        return direction == 1 and list(lookahead) == literals
+
+    def _walk(self, nodes, follow: FrozenSet[str], iterating: bool, top: bool = False) -> None:
+        """ Check every node of a sequence; follow is what can come right after the sequence """
+        nodes = list(nodes)
+        for i, (op, av) in enumerate(nodes):
+            rest, rest_nullable = self._first(nodes[i + 1:])
+            after = rest | follow if rest_nullable else rest
+            if op in _REPEATS:
+                lo, hi, body = av
+                unbounded = hi == sre_constants.MAXREPEAT and not (top and self._tempered(nodes[:i], body))
+                if lo != hi and (iterating or unbounded):
+                    self._check_overlap("a repeat", self._consumable(body), after, iterating)
+                loops = hi > 1
+                body_first, _ = self._first(body)
+                self._walk(body, body_first | after if loops else after, iterating or loops)
+            elif op is sre_constants.BRANCH:
+                alts = av[1]
+                #The parser factors common prefixes out, so "(a|aa)" arrives as "a(?:|a)"
+                widths = [alt.getwidth() for alt in alts]
+                if iterating and min(w[0] for w in widths) != max(w[1] for w in widths):
+                    chars = frozenset().union(*(self._consumable(alt) for alt in alts))
+                    self._check_overlap("an alternation of different lengths", chars, after, iterating)
+                if iterating:
+                    seen: FrozenSet[str] = frozenset()
+                    nullable_alts = 0
+                    for alt in alts:
+                        alt_first, alt_nullable = self._first(alt)
+                        if alt_first & seen:
+                            sample = "".join(sorted(alt_first & seen, key=lambda c: (c.isupper(), c))[:5])
+                            self._report(EXPONENTIAL, f"alternatives inside a repeat can both start with {sample!r}")
+                        seen |= alt_first
+                        nullable_alts += alt_nullable
+                    #"(a|a)" arrives as "a(?:|)": after factoring, duplicate alternatives are the ones that both match empty
+                    if nullable_alts > 1:
+                        self._report(EXPONENTIAL, "alternatives inside a repeat can match the same text")
+                for alt in alts:
+                    self._walk(alt, after, iterating)
+            elif op is sre_constants.SUBPATTERN:
+                self._walk(av[-1], after, iterating)
+            #Possessive repeats and atomic groups never give characters back, so they cannot blow up
+
+def lint_pattern(pattern: str, ignore_case: bool = False) -> List[LintFinding]:
+    """ Backtracking hazards in one pattern, empty when it is safe """
+    return _Linter(pattern, ignore_case).run()
+
+
+def check_patterns(patterns: Sequence[str], ignore_case: bool = False) -> List[LintFinding]:
+    """ Lint a rule list: raise UnsafePatternError for exponential patterns, return the polynomial findings """
+    findings = [finding for pattern in patterns for finding in lint_pattern(pattern, ignore_case)]
+    unsafe = [finding for finding in findings if finding.severity == EXPONENTIAL]
+    if unsafe:
+        raise UnsafePatternError(unsafe)
+    return findings
+
+
+def resolve_engine(engine: str) -> str:
+    """ "auto" picks re2 when google-re2 is installed and re otherwise """
+    engine = engine.lower()
+    if engine not in REGEX_ENGINES:
+        raise ValueError(f"Unknown regex engine {engine!r}, expected auto, re or re2")
+    if engine == "auto":
+        return "re2" if re2 is not None else "re"
+    if engine == "re2" and re2 is None:
+        raise ImportError("The re2 regex engine needs the google-re2 package")
+    return engine
+
+
+def regex_engine_from_env() -> str:
+    return resolve_engine(os.getenv("GUARDRAIL_REGEX_ENGINE", "auto"))
+
+
+def time_budget_from_env() -> Optional[float]:
+    """ GUARDRAIL_REGEX_BUDGET_MS in seconds, None when set to 0 """
+    budget_ms = float(os.getenv("GUARDRAIL_REGEX_BUDGET_MS", str(DEFAULT_BUDGET_MS)))
+    return budget_ms / 1000.0 if budget_ms > 0 else None
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False, engine: str = "re"):
+    """ Compile with the given engine; both objects offer finditer and match(text, pos) """
+    if engine == "re2":
+        options = re2.Options()
+        #Unsupported syntax (lookarounds) is expected and handled by the caller, keep RE2 from logging it
+        options.log_errors = False
+        return re2.compile(("(?i)" if ignore_case else "") + pattern, options)
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+def re2_error():
+    """ Exception type re2 raises for patterns it does not support, e.g. lookarounds """
+    return re2.error if re2 is not None else re.error
+
+
+_budget_active = False
+_chained_handler = None
+_handler_installed = False
+_MAIN_THREAD_ID = threading.main_thread().ident
+_unarmed_lock = threading.Lock()
+_unarmed_budgets = 0
+
+
+def _on_alarm(signum, frame) -> None:
+    if _budget_active:
+        raise RegexTimeout("regex scan exceeded its time budget")
+    if _chained_handler is not None:
+        _chained_handler(signum, frame)
+
+
+def budget_supported() -> bool:
+    return hasattr(signal, "setitimer") and threading.get_ident() == _MAIN_THREAD_ID
+
+
+def unarmed_budget_count() -> int:
+    """ Scans that asked for a budget but ran without one """
+    return _unarmed_budgets
+
+
+def _note_unarmed() -> None:
+    global _unarmed_budgets
+    with _unarmed_lock:
+        _unarmed_budgets += 1
+        first = _unarmed_budgets == 1
+    if first:
+        logger.warning(
+            "Regex time budget cannot be armed in thread %r (SIGALRM needs the main thread and setitimer), "
+            "guardrail scans there run without it", threading.current_thread().name,
+        )
+
+
+def arm_budget(seconds: Optional[float]) -> bool:
+    """ Start a budget of `seconds`; returns False when none was started and disarm_budget must not be called.
+
+    Nested budgets defer to the outermost one. The SIGALRM handler is
+    installed on first use and stays, passing alarms that arrive outside a
+    budget on to the handler it replaced, so arming costs one setitimer
+    call. Nothing else in the process should rely on ITIMER_REAL or replace
+    the SIGALRM handler afterwards.
+    """
+    global _budget_active, _chained_handler, _handler_installed
+    if not seconds or _budget_active:
+        return False
+    if not budget_supported():
+        _note_unarmed()
+        return False
+    if not _handler_installed:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        _chained_handler = previous if callable(previous) else None
+        _handler_installed = True
+    _budget_active = True
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    return True
+
+
+def disarm_budget() -> None:
+    global _budget_active
+    #Cleared first so an alarm landing in between is ignored
+    _budget_active = False
+    signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+@contextmanager
+def time_budget(seconds: Optional[float]) -> Iterator[None]:
+    """ Raise RegexTimeout inside the block once `seconds` of wall time have passed """
+    if not arm_budget(seconds):
+        yield
+        return
+    try:
+        yield
+    finally:
+        disarm_budget()
+
+#Known answers for the linter itself, checked before the rules
+_LINTER_CASES = [
+    ("(a+)+$", EXPONENTIAL),
+    ("(\\w+\\s?)*$", EXPONENTIAL),
+    ("^(a|a)*$", EXPONENTIAL),
+    ("^(?:ab|ab)+$", EXPONENTIAL),
+    ("(a|ab|b)*$", EXPONENTIAL),
+    ("(a|ab)*$", None),
+    ("(ab|ac)*$", None),
+    ("(a|b)*$", None),
+]
+
+
+def _check_linter() -> None:
+    for pattern, expected in _LINTER_CASES:
+        severities = {finding.severity for finding in lint_pattern(pattern)}
+        got = EXPONENTIAL if EXPONENTIAL in severities else None
+        if got != expected:
+            raise SystemExit(f"[FAIL] linter says {got or 'safe'} for {pattern!r}, expected {expected or 'safe'}")
+    print(f"[OK] Linter agrees on {len(_LINTER_CASES)} known patterns")
+
+
+def main() -> None:
+    import guardrails
+
+    _check_linter()
+
+    lists = [
+        ("prompt injection", guardrails.PROMPT_INJECTION_PATTERNS, True),
+        ("disallowed instruction", guardrails.DISALLOWED_INSTRUCTIONS, True),
+        ("pii", list(guardrails.PII_PATTERNS.values()), False),
+    ]
+    unsafe = 0
+    for name, patterns, ignore_case in lists:
+        for pattern in dict.fromkeys(patterns):
+            for finding in lint_pattern(pattern, ignore_case):
+                unsafe += finding.severity == EXPONENTIAL
+                print(f"[{finding.severity}] {name}: {pattern!r}\n    {finding.message}")
+    print(f"Regex engine: {regex_engine_from_env()}, time budget: {time_budget_from_env()} s")
+    if unsafe:
+        raise SystemExit(f"[FAIL] {unsafe} pattern(s) can backtrack exponentially")
+    print("[OK] No exponential backtracking in the guardrail rules")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Literal, Optional, Protocol
+
+CacheMode = Literal["exact", "deterministic"]
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[str]: ...
+    def set(self, key: str, value: str) -> None: ...
+    def close(self) -> None: ...
+
+
+class LRUBackend:
+    """ In-process LRU store, lost on restart """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """ On-disk store in a local SQLite file, survives restarts.
+
+    Least recently used rows are trimmed once the table grows past max_entries.
+    """
+
+    def __init__(self, path: str = "response_cache.sqlite3", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, last_used) VALUES (?, ?, ?)", (key, value, time.time())
+            )
+            self._writes += 1
+            #Trimming is a table scan, so only do it every few hundred writes
+            if self._writes % 256 == 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """ Cache of LLM completions in front of OllamaClient.chat.
+
+    The key is (model, system prompt, sanitized user text, temperature).
+    In "exact" mode every request is cached; in "deterministic" mode only
+    temperature 0 requests are, so sampled answers keep their variety.
+    """
+
+    def __init__(self, backend: CacheBackend, mode: CacheMode = "exact"):
+        if mode not in ("exact", "deterministic"):
+            raise ValueError(f"mode must be 'exact' or 'deterministic', got {mode!r}")
+        self.backend = backend
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_text: str, temperature: float) -> str:
+        raw = json.dumps([model, system_prompt, user_text, float(temperature)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cacheable(self, temperature: float) -> bool:
+        return self.mode == "exact" or temperature == 0
+
+    async def get_or_call(
+        self,
+        model: str,
+        system_prompt: str,
+        user_text: str,
+        temperature: float,
+        call: Callable[[], Awaitable[str]],
+    ) -> str:
+        """ Return the cached completion or run `call` and store its result """
+        if not self.cacheable(temperature):
+            self.bypassed += 1
+            return await call()
+        key = self.key(model, system_prompt, user_text, temperature)
+        cached = await asyncio.to_thread(self.backend.get, key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        answer = await call()
+        await asyncio.to_thread(self.backend.set, key, answer)
+        return answer
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": type(self.backend).__name__,
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+        }
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def response_cache_from_env() -> Optional[ResponseCache]:
+    """ Build the cache from RESPONSE_CACHE_* variables; None when RESPONSE_CACHE_BACKEND is unset or "off" """
+    backend_name = os.getenv("RESPONSE_CACHE_BACKEND", "off").lower()
+    if backend_name in ("", "off", "none"):
+        return None
+    max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+    if backend_name == "memory":
+        backend: CacheBackend = LRUBackend(max_entries=max_entries)
+    elif backend_name == "sqlite":
+        backend = SQLiteBackend(os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3"), max_entries=max_entries)
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {backend_name!r}, expected memory, sqlite or off")
+    return ResponseCache(backend, mode=os.getenv("RESPONSE_CACHE_MODE", "exact"))
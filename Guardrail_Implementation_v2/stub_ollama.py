@@ -0,0 +1,98 @@
+""" Local stand-in for the Ollama /api/chat endpoint, used by benchmarks and load tests.
+
+Replies are deterministic (derived from the last user message) and every
+request waits a fixed latency, configurable with STUB_LATENCY_MS.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Stub Ollama API")
+app.state.latency_ms = float(os.getenv("STUB_LATENCY_MS", "20"))
+
+
+def reply_for(messages: List[Dict[str, str]]) -> str:
+    """ Deterministic answer for a conversation """
+    user_text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    digest = hashlib.sha256(user_text.encode("utf-8")).hexdigest()[:12]
+    return f"Here is a short answer about your question ({digest}). Let me know if you need more details."
+
+
+@app.post("/api/chat")
+async def chat(request: Request) -> Any:
+    payload = await request.json()
+    model = payload.get("model", "stub")
+    content = reply_for(payload.get("messages", []))
+    if payload.get("stream"):
+        return StreamingResponse(_stream(model, content), media_type="application/x-ndjson")
+    await asyncio.sleep(app.state.latency_ms / 1000.0)
+    return {
+        "model": model,
+        "message": {"role": "assistant", "content": content},
+        "done": True,
+    }
+
+
+async def _stream(model: str, content: str) -> AsyncIterator[str]:
+    """ Ollama style NDJSON stream, one word per line, spreading the latency over the words """
+    words = content.split(" ")
+    delay = app.state.latency_ms / 1000.0 / len(words)
+    for i, word in enumerate(words):
+        await asyncio.sleep(delay)
+        token = word if i == 0 else " " + word
+        yield json.dumps({"model": model, "message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+    yield json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StubServer:
+    """ Run the stub in a child process: `with StubServer(latency_ms=5) as url: ...`
+
+    A separate process keeps the stub's own work off the event loop and CPU
+    time of the client being measured.
+    """
+
+    def __init__(self, latency_ms: float = 20.0, port: int = 0):
+        self.latency_ms = latency_ms
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> str:
+        env = dict(os.environ, STUB_LATENCY_MS=str(self.latency_ms), STUB_PORT=str(self.port))
+        self._proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        deadline = time.monotonic() + 15.0
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self.url
+            except OSError:
+                time.sleep(0.05)
+        self.__exit__()
+        raise RuntimeError("stub server did not start")
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", "11434")), log_level="warning")
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class AdmissionRejected(Exception):
+    """ Base class for requests turned away before reaching the LLM """
+    status_code = 503
+
+
+class QueueFullError(AdmissionRejected):
+    """ The wait queue is already at its maximum depth """
+    status_code = 429
+
+
+class QueueTimeoutError(AdmissionRejected):
+    """ The request waited longer than queue_timeout for a free slot """
+    status_code = 503
+
+
+class AdmissionController:
+    """ Semaphore-bounded admission for LLM calls.
+
+    At most max_concurrency calls run at once; up to max_queue more wait for
+    a slot. A request arriving at a full queue is rejected immediately and a
+    queued request gives up after queue_timeout seconds, so overload turns
+    into fast 429/503 responses instead of an ever growing backlog.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        on_wait: Optional[Callable[[float], None]] = None,
+        on_reject: Optional[Callable[[str], None]] = None,
+        on_queue_depth: Optional[Callable[[int], None]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._on_wait = on_wait
+        self._on_reject = on_reject
+        self._on_queue_depth = on_queue_depth
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _set_waiting(self, n: int) -> None:
+        self._waiting = n
+        if self._on_queue_depth is not None:
+            self._on_queue_depth(n)
+
+    def _reject(self, error: AdmissionRejected, reason: str) -> AdmissionRejected:
+        if self._on_reject is not None:
+            self._on_reject(reason)
+        return error
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """ Hold one LLM slot for the duration of the block, yielding the queue wait in seconds """
+        start = time.perf_counter()
+        if not self._slots.locked():
+            #A free slot is taken without suspending, so concurrent arrivals see it as used
+            await self._slots.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                raise self._reject(QueueFullError("LLM queue is full"), "queue_full")
+            self._set_waiting(self._waiting + 1)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject(QueueTimeoutError("Timed out waiting for an LLM slot"), "queue_timeout") from None
+            finally:
+                self._set_waiting(self._waiting - 1)
+        waited = time.perf_counter() - start
+        if self._on_wait is not None:
+            self._on_wait(waited)
+        try:
+            yield waited
+        finally:
+            self._slots.release()
+
+
+class SingleFlight:
+    """ Coalesce identical in-flight calls so they share one upstream request.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task. A caller being cancelled does not
+    cancel the shared work for the others.
+    """
+
+    def __init__(self, on_coalesced: Optional[Callable[[], None]] = None):
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._on_coalesced = on_coalesced
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, key=key: self._inflight.pop(key, None))
+        elif self._on_coalesced is not None:
+            self._on_coalesced()
+        return await asyncio.shield(task)
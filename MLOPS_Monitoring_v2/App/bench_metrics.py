@@ -0,0 +1,103 @@
+""" Microbenchmark of the per-request cost of the Prometheus middleware.
+
+Drives a trivial ASGI app directly (no sockets) so the numbers isolate the
+metrics work: no middleware, the old style (two .labels() lookups and
+time.time() per request, labelled by raw path), PrometheusMiddleware, and
+PrometheusMiddleware with a sampled latency histogram. It also times a
+/metrics scrape with many label series registered.
+
+    python bench_metrics.py --requests 50000
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+
+from metrics import PrometheusMiddleware
+
+
+def _metrics(registry: CollectorRegistry):
+    count = Counter("api_request_count", "requests", ["path", "method", "status_code"], registry=registry)
+    latency = Histogram("api_request_latency_seconds", "latency", ["path", "method"], registry=registry)
+    return count, latency
+
+
+ROUTE = SimpleNamespace(path="/items/{item_id}")
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def legacy_middleware(app, count, latency):
+    """ The previous middleware's metric work: raw path labels, two labels() calls, time.time() """
+    async def wrapped(scope, receive, send):
+        start = time.time()
+        status = {"code": 500}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await app(scope, receive, send_status)
+        finally:
+            latency.labels(path=scope["path"], method=scope["method"]).observe(time.time() - start)
+            count.labels(path=scope["path"], method=scope["method"], status_code=status["code"]).inc()
+    return wrapped
+
+
+async def _drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {"type": "http", "method": "GET", "path": f"/items/{i % 100}"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--series", type=int, default=2_000, help="label series registered for the scrape test")
+    args = parser.parse_args()
+
+    variants = {"no middleware": lambda c, l: endpoint}
+    variants["legacy (raw path, labels x2)"] = lambda c, l: legacy_middleware(endpoint, c, l)
+    variants["PrometheusMiddleware"] = lambda c, l: PrometheusMiddleware(endpoint, c, l)
+    variants["PrometheusMiddleware 10% sampled"] = lambda c, l: PrometheusMiddleware(endpoint, c, l, latency_sample_rate=0.1)
+
+    results = {}
+    for name, build in variants.items():
+        count, latency = _metrics(CollectorRegistry())
+        app = build(count, latency)
+        asyncio.run(_drive(app, 1000))
+        results[name] = asyncio.run(_drive(app, args.requests))
+
+    base = results["no middleware"]
+    print(f"{args.requests} requests per variant")
+    for name, us in results.items():
+        print(f"{name:34} {us:7.2f} us/request  (+{us - base:5.2f} us)")
+
+    registry = CollectorRegistry()
+    count, latency = _metrics(registry)
+    for i in range(args.series):
+        latency.labels(path=f"/route/{i}", method="GET").observe(0.01)
+        count.labels(path=f"/route/{i}", method="GET", status_code=200).inc()
+    start = time.perf_counter()
+    body = generate_latest(registry)
+    print(f"scrape with {args.series} routes: {(time.perf_counter() - start) * 1000:.1f} ms, {len(body) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+""" Streaming feature drift and data-quality monitor for the iris features.
+
+The reference is built once from the training split: per feature, bin
+edges at the training quantiles and the share of training rows in every
+bin. Live rows are binned against the same edges into exponentially
+decayed counts (half-life in rows), so the monitor always describes the
+recent traffic in constant memory. A row costs one bisect and one add
+per feature; the decay never touches the stored counts, instead every new
+row gets a weight larger by a constant factor, and everything is rescaled
+once the weights grow too large.
+
+PSI, KS and null rates are computed from the counts only when Prometheus
+scrapes, by DriftCollector. KS is taken at the bin edges, so with
+quantile bins it is within 1/bins of the exact two-sample statistic.
+
+    python drift.py ../../data/processed/train.csv drift_reference.json
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+#The pipeline's data layer, only there when running from a checkout; the Docker image ships App/ alone
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(REPO_ROOT / "src"))
+try:
+    import data_io
+except ImportError:
+    data_io = None
+
+FEATURES = ["sepal length (cm)", "sepal width (cm)", "petal length (cm)", "petal width (cm)"]
+#The training split in the pipeline's format (DATA_FORMAT), None without the data layer
+DEFAULT_REFERENCE_PATH = (
+    data_io.split_path("train", data_io.DEFAULT_FORMAT, REPO_ROOT / data_io.PROCESSED_DIR) if data_io is not None else None
+)
+DEFAULT_BINS = 20
+DEFAULT_HALF_LIFE_ROWS = 10_000
+#Bin shares are clipped to this before the logarithm in PSI, an empty bin would be infinite
+PSI_EPSILON = 1e-4
+#Row weights grow geometrically; past this everything is scaled back down
+RESCALE_AT = 1e100
+
+
+class DriftReference:
+    """ Per-feature inner bin edges and the training share of every bin """
+
+    def __init__(self, edges: Mapping[str, Sequence[float]], shares: Mapping[str, Sequence[float]], rows: int):
+        self.edges = {f: np.asarray(e, dtype=np.float64) for f, e in edges.items()}
+        self.shares = {f: np.asarray(s, dtype=np.float64) for f, s in shares.items()}
+        self.rows = rows
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features: Iterable[str] = FEATURES, bins: int = DEFAULT_BINS) -> "DriftReference":
+        edges, shares = {}, {}
+        for feature in features:
+            values = pd.to_numeric(df[feature], errors="coerce").dropna().to_numpy(dtype=np.float64)
+            #Repeated quantiles (discrete data) collapse into one edge
+            inner = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+            counts = np.bincount(np.searchsorted(inner, values, side="right"), minlength=len(inner) + 1)
+            edges[feature] = inner
+            shares[feature] = counts / max(len(values), 1)
+        return cls(edges, shares, len(df))
+
+    @classmethod
+    def from_file(cls, path: Path, bins: int = DEFAULT_BINS) -> "DriftReference":
+        """ A saved reference (.json), or one computed from a training split (.csv / .parquet) """
+        path = Path(path)
+        if path.suffix == ".json":
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            return cls(raw["edges"], raw["shares"], raw["rows"])
+        if data_io is None:
+            raise RuntimeError(f"Reading the split {path} needs src/data_io.py, point DRIFT_REFERENCE_PATH at a JSON reference instead")
+        return cls.from_frame(data_io.read_frame(path, columns=FEATURES), bins=bins)
+
+    def save(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "rows": self.rows,
+                "edges": {f: e.tolist() for f, e in self.edges.items()},
+                "shares": {f: s.tolist() for f, s in self.shares.items()},
+            }, f, indent=2)
+
+
+class DriftMonitor:
+    """ Exponentially decayed live histograms against a DriftReference.
+
+    observe() takes one row (a mapping of feature -> value) at O(1) cost,
+    observe_frame() a batch vectorised. Missing, NaN and non-numeric values
+    count towards the null rate and stay out of the histograms.
+    """
+
+    def __init__(self, reference: DriftReference, half_life_rows: float = DEFAULT_HALF_LIFE_ROWS):
+        self.reference = reference
+        self.half_life_rows = half_life_rows
+        self.growth = 2.0 ** (1.0 / half_life_rows)
+        #Longest batch chunk whose weights grow by at most 1e50
+        self._max_chunk = max(1, int(50 * math.log(10) / math.log(self.growth)))
+        self._edges: Dict[str, List[float]] = {f: e.tolist() for f, e in reference.edges.items()}
+        self._counts: Dict[str, List[float]] = {f: [0.0] * (len(e) + 1) for f, e in self._edges.items()}
+        self._nulls: Dict[str, float] = {f: 0.0 for f in self._edges}
+        self._weight = 0.0
+        self._scale = 1.0
+        self.rows_observed = 0
+
+    def observe(self, row: Mapping[str, Any]) -> None:
+        scale = self._scale
+        for feature, edges in self._edges.items():
+            value = row.get(feature)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = math.nan
+            if value != value:
+                self._nulls[feature] += scale
+            else:
+                self._counts[feature][bisect.bisect_right(edges, value)] += scale
+        self._weight += scale
+        self.rows_observed += 1
+        self._scale = scale * self.growth
+        if self._scale > RESCALE_AT:
+            self._rescale()
+
+    def observe_frame(self, df: pd.DataFrame) -> None:
+        for start in range(0, len(df), self._max_chunk):
+            part = df.iloc[start:start + self._max_chunk]
+            weights = self._scale * self.growth ** np.arange(len(part), dtype=np.float64)
+            for feature, edges in self.reference.edges.items():
+                if feature in part:
+                    values = pd.to_numeric(part[feature], errors="coerce").to_numpy(dtype=np.float64)
+                else:
+                    values = np.full(len(part), np.nan)
+                valid = ~np.isnan(values)
+                binned = np.bincount(np.searchsorted(edges, values[valid], side="right"),
+                                     weights=weights[valid], minlength=len(edges) + 1)
+                counts = self._counts[feature]
+                for i, w in enumerate(binned.tolist()):
+                    counts[i] += w
+                self._nulls[feature] += float(weights[~valid].sum())
+            self._weight += float(weights.sum())
+            self.rows_observed += len(part)
+            self._scale = float(weights[-1]) * self.growth
+            if self._scale > RESCALE_AT:
+                self._rescale()
+
+    def _rescale(self) -> None:
+        factor = 1.0 / self._scale
+        for feature, counts in self._counts.items():
+            self._counts[feature] = [c * factor for c in counts]
+            self._nulls[feature] *= factor
+        self._weight *= factor
+        self._scale = 1.0
+
+    def window_rows(self) -> float:
+        """ Effective number of rows behind the current statistics """
+        return self._weight / self._scale * self.growth if self._weight else 0.0
+
+    def feature_stats(self) -> Dict[str, Dict[str, float]]:
+        """ psi, ks and null_rate per feature over the decayed window; empty until rows arrive """
+        if not self._weight:
+            return {}
+        stats = {}
+        for feature, counts in self._counts.items():
+            counts = np.asarray(counts)
+            valid = counts.sum()
+            entry = {"null_rate": self._nulls[feature] / self._weight}
+            if valid > 0:
+                current = counts / valid
+                reference = self.reference.shares[feature]
+                cur, ref = np.clip(current, PSI_EPSILON, None), np.clip(reference, PSI_EPSILON, None)
+                entry["psi"] = float(np.sum((cur - ref) * np.log(cur / ref)))
+                entry["ks"] = float(np.abs(np.cumsum(current) - np.cumsum(reference))[:-1].max(initial=0.0))
+            stats[feature] = entry
+        return stats
+
+
+class DriftCollector:
+    """ Prometheus collector reading a DriftMonitor at scrape time """
+
+    def __init__(self, monitor: DriftMonitor):
+        self.monitor = monitor
+
+    def collect(self):
+        psi = GaugeMetricFamily("feature_drift_psi", "Population stability index of the recent rows against training", labels=["feature"])
+        ks = GaugeMetricFamily("feature_drift_ks", "Kolmogorov-Smirnov statistic of the recent rows against training (at bin edges)", labels=["feature"])
+        null_rate = GaugeMetricFamily("feature_null_rate", "Share of recent rows with a missing or non-numeric value", labels=["feature"])
+        for feature, entry in self.monitor.feature_stats().items():
+            null_rate.add_metric([feature], entry["null_rate"])
+            if "psi" in entry:
+                psi.add_metric([feature], entry["psi"])
+                ks.add_metric([feature], entry["ks"])
+        window = GaugeMetricFamily("feature_drift_window_rows", "Effective number of rows behind the drift statistics",
+                                   value=self.monitor.window_rows())
+        rows = CounterMetricFamily("feature_drift_rows", "Rows observed by the drift monitor", value=self.monitor.rows_observed)
+        yield from (psi, ks, null_rate, window, rows)
+
+
+def load_monitor(path: Optional[str] = None) -> Optional[DriftMonitor]:
+    """ Monitor for DRIFT_REFERENCE_PATH (default: the processed training split), None if there is no reference """
+    path = path or os.getenv("DRIFT_REFERENCE_PATH") or DEFAULT_REFERENCE_PATH
+    if path is None or not Path(path).exists():
+        return None
+    reference = DriftReference.from_file(path, bins=int(os.getenv("DRIFT_BINS", DEFAULT_BINS)))
+    return DriftMonitor(reference, half_life_rows=float(os.getenv("DRIFT_HALF_LIFE_ROWS", DEFAULT_HALF_LIFE_ROWS)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a drift reference from a training split")
+    parser.add_argument("train_path", type=Path, help="training split, .csv or .parquet")
+    parser.add_argument("output", type=Path, help="reference JSON for DRIFT_REFERENCE_PATH")
+    parser.add_argument("--bins", type=int, default=DEFAULT_BINS)
+    args = parser.parse_args()
+    DriftReference.from_file(args.train_path, args.bins).save(args.output)
+    print(f"[OK] Drift reference written to {args.output}")
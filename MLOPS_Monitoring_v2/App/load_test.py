@@ -0,0 +1,85 @@
+""" Load test for the /chat endpoint against a local OpenAI-compatible stub.
+
+Starts stub_openai.py with a fixed per-request latency, points the service
+at it and fires concurrent /chat requests in-process. If the LLM path is
+truly non-blocking the wall time stays close to one stub latency per
+"wave" of concurrent requests rather than latency * requests, and the
+stub sees the requests in flight together.
+
+    python load_test.py --requests 200 --concurrency 50 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+from stub_openai import StubServer
+
+
+async def run(requests: int, concurrency: int, stub_url: str) -> dict:
+    import main
+
+    latencies = []
+    statuses = {}
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120.0) as http:
+
+        async def one(i: int) -> None:
+            async with sem:
+                start = time.perf_counter()
+                resp = await http.post("/chat", json={"user_id": f"u{i}", "message": f"load test message {i}"})
+                latencies.append(time.perf_counter() - start)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as http:
+        stub_stats = (await http.get(f"{stub_url}/stats")).json()
+    await main.client.close()
+    ordered = sorted(latencies)
+    return {
+        "wall": wall,
+        "rps": requests / wall,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+        "statuses": statuses,
+        "peak_in_flight": stub_stats["peak_in_flight"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    with StubServer(latency_ms=args.latency_ms) as url:
+        os.environ.setdefault("OPENAI_API_KEY", "ollama")
+        os.environ["LLM_BASE_URL"] = f"{url}/v1"
+        os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+        os.environ["LLM_MAX_QUEUE"] = str(args.requests)
+        r = asyncio.run(run(args.requests, args.concurrency, url))
+
+    serial_wall = args.requests * args.latency_ms / 1000.0
+    overlap = serial_wall / r["wall"]
+    print(f"{args.requests} requests, concurrency {args.concurrency}, stub latency {args.latency_ms:.0f} ms")
+    print(f"wall {r['wall']:.2f}s ({r['rps']:.1f} req/s), p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms")
+    print(f"statuses {r['statuses']}, peak in-flight at stub {r['peak_in_flight']}")
+    print(f"overlap factor {overlap:.1f}x vs serial ({serial_wall:.1f}s)")
+    #Requests overlap if the stub held at least half the target concurrency at once
+    #and the run clearly beat serial execution
+    ok = r["peak_in_flight"] >= min(args.concurrency, args.requests) / 2 and overlap > 2
+    print("[OK] concurrent requests overlap" if ok else "[FAIL] requests did not overlap")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,22 @@
-from datetime import time
+import asyncio
+import io
+import time
+import json
 import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import httpx
+import pandas as pd
 from fastapi import FastAPI, HTTPException, Request, Response
 from dotenv import load_dotenv
-from openai import OpenAI
-from pydantic import BaseModel
+from openai import APITimeoutError, AsyncOpenAI, DefaultAsyncHttpxClient
+from pydantic import BaseModel, Field
 import uvicorn
-from prometheus_client import (Gauge,Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST)
+from prometheus_client import (Gauge,Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY)
+from admission import AdmissionController, AdmissionRejected, SingleFlight
+from drift import DriftCollector, load_monitor
+from metrics import PrometheusMiddleware
+from pricing import load_price_table
 
 load_dotenv()
 
@@ -14,19 +25,40 @@ if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable not set")
 
 #LLM_MODEL = "gpt-3.5-turbo"
-LLM_MODEL = "qwen3:8b"
+LLM_MODEL = os.getenv("LLM_MODEL", "qwen3:8b")
 
 if not LLM_MODEL:
     raise ValueError("LLM_MODEL environment variable not set")
 
-app = FastAPI(title="Open AI char service using OPENAI", version="1.0.0")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:11434/v1")  # Ollama's local API endpoint
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+#Per-model, per-token-type USD prices, overridable with LLM_PRICES / LLM_PRICES_FILE
+PRICES = load_price_table()
 
 #client = OpenAI(api_key=OPENAI_API_KEY)
-client = OpenAI(
-        base_url="http://localhost:11434/v1",  # Ollama's local API endpoint
-        api_key="ollama"
+#One async client and connection pool shared by every request; the SDK retries
+#connection errors, 408/409/429 and 5xx responses with exponential backoff and jitter
+client = AsyncOpenAI(
+        base_url=LLM_BASE_URL,
+        api_key="ollama",
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=5.0),
+        max_retries=LLM_MAX_RETRIES,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            ),
+        ),
         )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await client.close()
+
+app = FastAPI(title="Open AI char service using OPENAI", version="1.0.0", lifespan=lifespan)
+
 ##MODELS
 class chatResponse(BaseModel):
     reply: str
@@ -38,6 +70,12 @@ class chatResponse(BaseModel):
 class chatRequest(BaseModel):
     user_id: str
     message: str
+    #Optional per-request limits, they can only tighten the configured client defaults
+    timeout_seconds: Optional[float] = Field(None, gt=0, le=LLM_TIMEOUT_SECONDS)
+    max_retries: Optional[int] = Field(None, ge=0, le=LLM_MAX_RETRIES)
+
+class driftRequest(BaseModel):
+    rows: List[Dict[str, Any]]
 
 REQUEST_COUNT = Counter(
     "api_request_count",
@@ -66,62 +104,179 @@ LLM_ERRORS = Counter(
     "Total number of LLM errors",
     ["type"]
 )
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Total number of LLM tokens",
+    ["model", "type"]
+)
+LLM_TTFT = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from sending the LLM request to the first generated token",
+    ["model"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+)
+#Ends at the first streamed chunk, which servers that send the role in a chunk of its own emit once the prompt is
+#evaluated; TTFT also includes sampling the first token. Where the role rides on the first token the two coincide.
+LLM_PROMPT_PROCESSING = Histogram(
+    "llm_prompt_processing_seconds",
+    "Time from sending the LLM request to the first streamed chunk, before the first token is sampled",
+    ["model"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_generation_tokens_per_second",
+    "Completion tokens generated per second after the first token",
+    ["model"],
+    buckets=(1, 2.5, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500)
+)
 ACTIVE_REQUESTS = Gauge(
     "active_requests",
     "Number of active requests being processed"
 
 
 )
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM requests spend waiting for a free generation slot",
+    ["model"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth",
+    "Number of LLM requests waiting for a generation slot"
+)
+LLM_REJECTED = Counter(
+    "llm_admission_rejected_total",
+    "LLM requests rejected by admission control",
+    ["reason"]
+)
+LLM_COALESCED = Counter(
+    "llm_coalesced_total",
+    "LLM requests answered by an identical in-flight request"
+)
+LLM_USAGE_MISSING = Counter(
+    "llm_usage_missing_total",
+    "LLM responses without a usage report, whose token counts were estimated",
+    ["model"]
+)
 
-@app.middleware("http")
-async def prometheus_middleware(request: Request, call_next)-> Response:
-    start_time = time.time()
-    
+#Admission control in front of the LLM backend
+admission = AdmissionController(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+    on_wait=LLM_QUEUE_WAIT.labels(model=LLM_MODEL).observe,
+    on_reject=lambda reason: LLM_REJECTED.labels(reason=reason).inc(),
+    on_queue_depth=LLM_QUEUE_DEPTH.set,
+)
+single_flight = SingleFlight(on_coalesced=LLM_COALESCED.inc)
+
+#Feature drift against the training split, exported with the other metrics; None without a reference file
+drift_monitor = load_monitor()
+if drift_monitor is not None:
+    REGISTRY.register(DriftCollector(drift_monitor))
+
+#Request metrics, labelled by route template with cached label children
+app.add_middleware(
+    PrometheusMiddleware,
+    request_count=REQUEST_COUNT,
+    request_latency=REQUEST_LATENCY,
+    latency_sample_rate=float(os.getenv("METRICS_LATENCY_SAMPLE_RATE", "1.0")),
+)
+
+Messages = List[Dict[str, str]]
+
+def estimate_prompt_tokens(messages: Messages) -> int:
+    """ Rough prompt size for backends that report no usage: about 4 characters per token plus the chat framing """
+    return sum(4 + -(-len(m.get("content") or "") // 4) for m in messages)
+
+async def call_llm(messages: Messages, timeout: Optional[float] = None, max_retries: Optional[int] = None):
+    """ Identical in-flight prompts share one upstream call, which waits for an admission slot.
+
+    timeout / max_retries override the client defaults for this call only.
+    """
+    key = json.dumps([messages, timeout, max_retries], sort_keys=True)
+    return await single_flight.do(key, lambda: _admitted_llm_call(messages, timeout, max_retries))
+
+async def _admitted_llm_call(messages: Messages, timeout: Optional[float], max_retries: Optional[int]):
     try:
-        response = await call_next(request)
-        status_code = response.status_code
-        return response
-    except Exception as e:
-        status_code = 500
-        raise e
-    finally:
-        latency = time.time() - start_time
-        REQUEST_LATENCY.labels(
-            path=request.url.path,
-            method=request.method
-        ).observe(latency)
-        REQUEST_COUNT.labels(
-            path=request.url.path,
-            method=request.method,
-            status_code=status_code
-        ).inc()
-    
-        return response
+        async with admission.slot():
+            return await _llm_call(messages, timeout, max_retries)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": "1"})
 
-async def call_llm(messages: str):
+async def _llm_call(messages: Messages, timeout: Optional[float], max_retries: Optional[int]):
+    """ Streamed completion, so time to first token and generation speed can be measured.
+
+    The client timeout applies per read and the SDK retries opening the
+    stream; once it is open, the whole generation has to finish within the
+    timeout too, or a server that keeps trickling chunks holds the slot.
+    """
     ACTIVE_REQUESTS.inc()
-    start = time.time()
+    start = time.perf_counter()
+    llm = client
+    if timeout is not None or max_retries is not None:
+        options = {}
+        if timeout is not None:
+            options["timeout"] = timeout
+        if max_retries is not None:
+            options["max_retries"] = max_retries
+        llm = client.with_options(**options)
+    parts = []
+    usage = None
+    content_chunks = 0
+    first_chunk_at = first_token_at = None
     try:
-        response = await client.chat.completions.create(
+        stream = await llm.chat.completions.create(
             model=LLM_MODEL,
             messages=messages,
-            timeout=30.0,
+            stream=True,
+            stream_options={"include_usage": True},
         )
-        llm_duration = time.time() - start
-        LLM_LATENCY.observe(llm_duration, model=LLM_MODEL)
+        async with stream, asyncio.timeout(timeout if timeout is not None else LLM_TIMEOUT_SECONDS):
+            async for chunk in stream:
+                now = time.perf_counter()
+                if first_chunk_at is None:
+                    first_chunk_at = now
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first_token_at is None:
+                            first_token_at = now
+                        content_chunks += 1
+                        parts.append(delta)
+                if chunk.usage is not None:
+                    usage = chunk.usage
+        end = time.perf_counter()
+        LLM_LATENCY.labels(model=LLM_MODEL).observe(end - start)
     except Exception as e:
-        error_type = "timeout" if "timeout" in str(e).lower() else "other"
-        LLM_ERRORS.labels(type=error_type).inc()
-        raise HTTPException(status_code=500, detail=f"LLM call failed: {str(e)}")
+        timed_out = isinstance(e, (APITimeoutError, TimeoutError)) or "timeout" in str(e).lower()
+        LLM_ERRORS.labels(type="timeout" if timed_out else "other").inc()
+        raise HTTPException(status_code=500, detail=f"LLM call failed: {str(e) or type(e).__name__}")
     finally:
         ACTIVE_REQUESTS.dec()
-    text = response.choices[0].message.content
-    prompt_tokens = response.usage.prompt_tokens
-    completion_tokens = response.usage.completion_tokens
-    cost_usd = (prompt_tokens + completion_tokens) * 0.00002  
-    
-    LLM_TOKENS.labels(type="prompt").inc(prompt_tokens)
-    LLM_TOKENS.labels(type="completion").inc(completion_tokens)
+    text = "".join(parts)
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens
+        completion_tokens = usage.completion_tokens
+    else:
+        #Backends that ignore include_usage: estimate the prompt, and they stream roughly one token per chunk
+        LLM_USAGE_MISSING.labels(model=LLM_MODEL).inc()
+        prompt_tokens = estimate_prompt_tokens(messages)
+        completion_tokens = content_chunks
+
+    #The OpenAI-compatible API has no prompt_eval_duration, the first chunk is the closest marker for it
+    if first_chunk_at is not None:
+        LLM_PROMPT_PROCESSING.labels(model=LLM_MODEL).observe(first_chunk_at - start)
+    if first_token_at is not None:
+        LLM_TTFT.labels(model=LLM_MODEL).observe(first_token_at - start)
+        decode_seconds = end - first_token_at
+        if completion_tokens > 1 and decode_seconds > 0:
+            LLM_TOKENS_PER_SECOND.labels(model=LLM_MODEL).observe((completion_tokens - 1) / decode_seconds)
+
+    cost_usd = PRICES.cost(LLM_MODEL, prompt_tokens, completion_tokens)
+    LLM_TOKENS.labels(model=LLM_MODEL, type="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=LLM_MODEL, type="completion").inc(completion_tokens)
     LLM_COST.labels(model=LLM_MODEL).inc(cost_usd)
     return text,prompt_tokens, completion_tokens, cost_usd
     
@@ -139,11 +294,14 @@ async def health():
     return {"status": "healthy"}
 
 @app.post("/chat", response_model=chatResponse)
-async def char(request: chatRequest, reponse: chatResponse):
-    start = time.time()
-    reply, prompt_tokens, completion_tokens, cost_usd = await call_llm(request.message
+async def char(request: chatRequest):
+    start = time.perf_counter()
+    reply, prompt_tokens, completion_tokens, cost_usd = await call_llm(
+        [{"role": "user", "content": request.message}],
+        timeout=request.timeout_seconds,
+        max_retries=request.max_retries,
     )
-    latency_ms = (time.time() - start)*1000
+    latency_ms = (time.perf_counter() - start)*1000
     
     return chatResponse(
         reply=reply,
@@ -153,6 +311,30 @@ async def char(request: chatRequest, reponse: chatResponse):
         cost_usd=cost_usd
     )
 
+def _drift_monitor():
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Drift monitor has no reference, set DRIFT_REFERENCE_PATH")
+    return drift_monitor
+
+@app.post("/drift/observe")
+async def drift_observe(request: driftRequest):
+    """ Feature rows seen by the model, e.g. mirrored prediction traffic """
+    monitor = _drift_monitor()
+    for row in request.rows:
+        monitor.observe(row)
+    return {"rows": len(request.rows), "rows_observed": monitor.rows_observed}
+
+@app.post("/drift/batch")
+async def drift_batch(request: Request):
+    """ A batch file as a CSV body with a header row """
+    monitor = _drift_monitor()
+    try:
+        df = pd.read_csv(io.BytesIO(await request.body()))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV body: {e}")
+    monitor.observe_frame(df)
+    return {"rows": len(df), "rows_observed": monitor.rows_observed}
+
 @app.get("/metrics")
 async def metrics():
     data = generate_latest()
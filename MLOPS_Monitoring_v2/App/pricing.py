@@ -0,0 +1,55 @@
+import json
+import os
+from typing import Dict, Mapping, Optional
+
+TokenPrices = Dict[str, float]
+
+#USD per token; the "default" entry is the old flat rate and covers unknown models
+DEFAULT_PRICES: Dict[str, TokenPrices] = {
+    "default": {"prompt": 0.00002, "completion": 0.00002},
+    "gpt-3.5-turbo": {"prompt": 0.0000005, "completion": 0.0000015},
+    "gpt-4o-mini": {"prompt": 0.00000015, "completion": 0.0000006},
+}
+
+
+class PriceTable:
+    """ Per-model, per-token-type prices in USD per token.
+
+    A model missing from the table falls back to the "default" entry, and a
+    token type missing from a model entry falls back to the default price
+    for that type, so a partial override only needs the prices it changes.
+    """
+
+    def __init__(self, prices: Mapping[str, Mapping[str, float]]):
+        self.prices: Dict[str, TokenPrices] = {model: dict(entry) for model, entry in prices.items()}
+        self.prices.setdefault("default", dict(DEFAULT_PRICES["default"]))
+
+    def price(self, model: str, token_type: str) -> float:
+        entry = self.prices.get(model)
+        if entry is not None and token_type in entry:
+            return entry[token_type]
+        return self.prices["default"].get(token_type, 0.0)
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        return prompt_tokens * self.price(model, "prompt") + completion_tokens * self.price(model, "completion")
+
+
+def load_price_table(raw: Optional[str] = None, path: Optional[str] = None) -> PriceTable:
+    """ DEFAULT_PRICES overridden by LLM_PRICES (inline JSON) or LLM_PRICES_FILE (a JSON file).
+
+    Both take the shape {"model": {"prompt": usd_per_token, "completion": usd_per_token}}.
+    """
+    raw = raw if raw is not None else os.getenv("LLM_PRICES")
+    path = path if path is not None else os.getenv("LLM_PRICES_FILE")
+    prices = {model: dict(entry) for model, entry in DEFAULT_PRICES.items()}
+    overrides = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            overrides.update(json.load(f))
+    if raw:
+        overrides.update(json.loads(raw))
+    for model, entry in overrides.items():
+        if not isinstance(entry, dict):
+            raise ValueError(f"Price entry for {model!r} must be an object of token type -> USD per token")
+        prices.setdefault(model, {}).update({token_type: float(usd) for token_type, usd in entry.items()})
+    return PriceTable(prices)
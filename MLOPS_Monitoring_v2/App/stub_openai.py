@@ -0,0 +1,145 @@
+""" Local OpenAI-compatible /v1/chat/completions stub for load tests.
+
+Every request waits STUB_LATENCY_MS and gets a deterministic reply with
+token usage, either as one JSON body or as an SSE stream ("stream": true)
+where a fifth of the latency is spent before the first token. GET /stats
+reports how many requests were in flight at once, which is how the load
+test proves that calls overlap.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Stub OpenAI-compatible API")
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "200"))
+STATS = {"requests": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+def reply_for(messages: List[Dict[str, Any]]) -> str:
+    """ Deterministic answer for a conversation """
+    user_text = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    digest = hashlib.sha256(user_text.encode("utf-8")).hexdigest()[:12]
+    return f"Stub answer {digest}: here is a short and deterministic reply to your message."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+def _usage(messages: List[Dict[str, Any]], content: str) -> Dict[str, int]:
+    prompt_tokens = sum(_tokens(str(m.get("content", ""))) for m in messages)
+    completion_tokens = _tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Any:
+    payload = await request.json()
+    messages = payload.get("messages", [])
+    content = reply_for(messages)
+    STATS["requests"] += 1
+    if payload.get("stream"):
+        include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+        return StreamingResponse(
+            _stream(payload.get("model", "stub"), messages, content, include_usage), media_type="text/event-stream"
+        )
+    STATS["in_flight"] += 1
+    STATS["peak_in_flight"] = max(STATS["peak_in_flight"], STATS["in_flight"])
+    try:
+        await asyncio.sleep(LATENCY_MS / 1000.0)
+    finally:
+        STATS["in_flight"] -= 1
+    return {
+        "id": f"chatcmpl-{STATS['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": _usage(messages, content),
+    }
+
+
+async def _stream(model: str, messages: List[Dict[str, Any]], content: str, include_usage: bool) -> AsyncIterator[str]:
+    """ OpenAI style SSE chunks: role, one chunk per word, finish, optional usage, [DONE] """
+    chunk_id = f"chatcmpl-{STATS['requests']}"
+
+    def event(choices: List[Dict[str, Any]], usage: Optional[Dict[str, int]] = None) -> str:
+        body = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": choices}
+        if usage is not None:
+            body["usage"] = usage
+        return f"data: {json.dumps(body)}\n\n"
+
+    STATS["in_flight"] += 1
+    STATS["peak_in_flight"] = max(STATS["peak_in_flight"], STATS["in_flight"])
+    try:
+        words = content.split(" ")
+        await asyncio.sleep(LATENCY_MS / 1000.0 * 0.2)
+        yield event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        per_word = LATENCY_MS / 1000.0 * 0.8 / len(words)
+        for i, word in enumerate(words):
+            yield event([{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}])
+            await asyncio.sleep(per_word)
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if include_usage:
+            yield event([], usage=_usage(messages, content))
+        yield "data: [DONE]\n\n"
+    finally:
+        STATS["in_flight"] -= 1
+
+
+@app.get("/stats")
+async def stats() -> Dict[str, int]:
+    return STATS
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StubServer:
+    """ Run the stub in a child process: `with StubServer(latency_ms=200) as base_url: ...` """
+
+    def __init__(self, latency_ms: float = 200.0, port: int = 0):
+        self.latency_ms = latency_ms
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> str:
+        env = dict(os.environ, STUB_LATENCY_MS=str(self.latency_ms), STUB_PORT=str(self.port))
+        self._proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        deadline = time.monotonic() + 15.0
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self.url
+            except OSError:
+                time.sleep(0.05)
+        self.__exit__()
+        raise RuntimeError("stub server did not start")
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", "8001")), log_level="warning")
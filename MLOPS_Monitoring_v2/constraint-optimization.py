@@ -1,56 +1,26 @@
-import pandas as pd
-from fairlearn.reductions import ConstraintOptimization, DemographicParity
-from sklearn.linear_model import LogisticRegression
+import sys
 from pathlib import Path
 
-from sklearn.model_selection import train_test_split
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+from data_io import FEATURE_COLUMNS, TARGET_COLUMN, read_frame, split_path
+from fairness import grid_search, group_codes, predict_fit
 
-RAW_DATA_PATH = Path('./data/raw/iris.csv')
-PROCESSED_DIR = Path('./data/processed/')
+SENSITIVE_COLUMN = 'petal length (cm)'
+#Demographic parity needs a binary outcome, virginica vs the rest
+POSITIVE_CLASS = 2
 
+#The prepared splits are reused as they are, prepare_data.py owns the splitting
+train_df = read_frame(split_path('train'))
+test_df = read_frame(split_path('test'))
 
-PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-df = pd.read_csv(RAW_DATA_PATH)
+features = [c for c in FEATURE_COLUMNS if c != SENSITIVE_COLUMN]
+X_train = train_df[features].to_numpy()
+y_train = (train_df[TARGET_COLUMN] == POSITIVE_CLASS).to_numpy().astype(int)
+X_test = test_df[features].to_numpy()
+sensitive_feature, _ = group_codes(train_df[SENSITIVE_COLUMN], bins=[2.5, 5.0])
 
-train_df, test_df = train_test_split(
-    df, 
-    test_size=0.2, 
-    random_state=42,
-    stratify=df['target']
-    )
+results = grid_search(X_train, y_train, sensitive_feature, grid_size=100)
 
-train_df.to_csv(PROCESSED_DIR / 'train.csv', index=False)
-test_df.to_csv(PROCESSED_DIR / 'test.csv', index=False)
+y_pred = predict_fit(results[0], X_test)
 
-
-TRAIN_PATH = Path('./data/processed/train.csv')
-TEST_PATH = Path('./data/processed/test.csv')
-
-
-
-base_model = LogisticRegression(solver='liblinear', itermax=1000)
-
-constraint = DemographicParity()
-
-train_df = pd.read_csv(TRAIN_PATH)
-test_df = pd.read_csv(TEST_PATH)
-
-X_train = train_df.drop(columns=['target', 'petal length (cm)'])
-y_train = train_df['target']
-X_test = test_df.drop(columns=['target', 'petal length (cm)'])
-y_test = test_df['target']
-sensitive_feature = train_df['petal length (cm)']
-
-mitigator = ConstraintOptimization(
-    estimator=base_model,
-    constraints=constraint,
-#    grid_size=100,
-#    eps=0.01
-)
-
-#mitigator.fit(X_train, y_train, sensitive_features=X_train['gender'])
-mitigator.fit(X_train, y_train, sensitive_features=sensitive_feature)
-
-y_pred = mitigator.predict(X_test)
-
-print("Predictions after applying Constraint Optimization for Demographic Parity:" + str(y_pred))
\ No newline at end of file
+print("Predictions after applying Constraint Optimization for Demographic Parity:" + str(y_pred))
@@ -1,19 +1,19 @@
-import numpy as np
+import sys
+from pathlib import Path
 
-train_df = X_train.copy()
-train_df['target'] = y_train.values
-train_df['gender'] = X_train['gender'].values
+import pandas as pd
 
-group_positive_rates = train_df.groupby('gender')['target'].mean()
-overall_positive_rate = train_df['target'].mean()
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+from data_io import read_frame, split_path
+from reweighing import reweighing_weights
 
-weights = {}
+SENSITIVE_COLUMN = 'petal length band'
 
-for _, row in train_df.iterrows():
-    g=row['gender']
-    w = (overall_positive_rate / group_positive_rates[g]) 
-    weights.append(w)
+train_df = read_frame(split_path('train'))
 
-sample_weights = np.array(weights)
+#Iris has no demographic column, so banded petal length stands in for the sensitive attribute
+train_df[SENSITIVE_COLUMN] = pd.cut(train_df['petal length (cm)'], bins=[0, 2.5, 5.0, float('inf')], labels=['short', 'medium', 'long'])
 
-print("Sample weights calculated for reweighing:" + str(sample_weights))
\ No newline at end of file
+sample_weights = reweighing_weights(train_df, [SENSITIVE_COLUMN])
+
+print("Sample weights calculated for reweighing:" + str(sample_weights))
@@ -0,0 +1,44 @@
+""" Guardrail hot paths: PII redaction and the input / output policy checks """
+import sys
+
+from corpora import ADVERSARIAL, adversarial_text, text_corpus
+from harness import ROOT, benchmark
+
+sys.path.insert(0, str(ROOT / "Guardrail_Implementation_v2"))
+import guardrails  # noqa: E402
+
+#Decision caching would turn every repeat after the first into a dict lookup
+guardrails.disable_policy_cache()
+
+CHECKS = {
+    "redact_pii": guardrails.redact_pii,
+    "policy_check_input": guardrails.policy_check_input,
+    "policy_check_output": guardrails.policy_check_output,
+}
+
+
+@benchmark("guardrails", params={"check": list(CHECKS), "corpus": ["short", "long"]})
+def corpus(check, corpus):
+    fn, texts = CHECKS[check], text_corpus(corpus)
+    yield lambda: [fn(t) for t in texts]
+
+
+#1000 characters is the /chat user_text limit, 10000 a long model output
+@benchmark("guardrails", params={"check": list(CHECKS), "case": list(ADVERSARIAL), "chars": [1000, 10000]}, repeat=3)
+def adversarial(check, case, chars):
+    fn, text = CHECKS[check], adversarial_text(case, chars)
+    yield lambda: fn(text)
+
+
+@benchmark("guardrails", params={"chunk_chars": [8, 64]}, repeat=3)
+def streaming_output_guard(chunk_chars):
+    text = text_corpus("long")[0]
+    chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+    def run():
+        guard = guardrails.StreamingOutputGuard()
+        for chunk in chunks:
+            guard.feed(chunk)
+        guard.finish()
+
+    yield run
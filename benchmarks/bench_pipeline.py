@@ -0,0 +1,48 @@
+""" Data pipeline stages on synthetic iris data scaled to a million rows """
+import contextlib
+import importlib
+import io
+import sys
+
+from corpora import pipeline_workspace, scaled_rows
+from harness import ROOT, benchmark
+
+sys.path.insert(0, str(ROOT / "src"))
+prepare = importlib.import_module("prepare_data")
+validate = importlib.import_module("validate_data")
+train = importlib.import_module("train_model")
+
+ROWS = [scaled_rows(1_000_000)]
+FORMATS = ["csv", "parquet"]
+
+
+def _quiet(fn, *args, **kwargs):
+    """ The stages report with print, which would only add terminal time to the measurement """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@benchmark("pipeline", params={"rows": ROWS, "format": FORMATS}, repeat=3, min_time=0)
+def prepare_data(rows, format):
+    with pipeline_workspace(rows):
+        yield lambda: _quiet(prepare.prepare_data, format)
+
+
+@benchmark("pipeline", params={"rows": ROWS, "format": ["parquet"]}, repeat=3, min_time=0)
+def prepare_data_streaming(rows, format):
+    with pipeline_workspace(rows):
+        yield lambda: _quiet(prepare.prepare_data_streaming, format, chunk_rows=max(rows // 4, 1))
+
+
+@benchmark("pipeline", params={"rows": ROWS, "format": FORMATS}, repeat=3, min_time=0)
+def validate_data(rows, format):
+    with pipeline_workspace(rows):
+        _quiet(prepare.prepare_data, format)
+        yield lambda: _quiet(validate.main, ["--format", format])
+
+
+@benchmark("pipeline", params={"rows": ROWS, "format": ["parquet"]}, repeat=3, min_time=0)
+def train_model(rows, format):
+    with pipeline_workspace(rows):
+        _quiet(prepare.prepare_data, format)
+        yield lambda: _quiet(train.main, format)
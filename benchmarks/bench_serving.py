@@ -0,0 +1,51 @@
+""" Model serving hot paths: the NumPy scorer, the sklearn model it replaces and the micro-batcher """
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+from sklearn.linear_model import LogisticRegression
+
+from harness import ROOT, benchmark
+
+sys.path.insert(0, str(ROOT / "src"))
+from bench_data_format import synthetic_iris  # noqa: E402
+from data_io import FEATURE_COLUMNS, TARGET_COLUMN  # noqa: E402
+from fast_scorer import export_linear_model  # noqa: E402
+from serve_model import MicroBatcher, ModelServer  # noqa: E402
+
+
+def _model_files(directory: Path):
+    df = synthetic_iris(10_000)
+    model = LogisticRegression(max_iter=200).fit(df[FEATURE_COLUMNS], df[TARGET_COLUMN])
+    joblib.dump(model, directory / "model.pkl")
+    export_linear_model(model, directory / "model.npz")
+    return directory / "model.pkl", directory / "model.npz"
+
+
+@benchmark("serving", params={"model": ["npz", "pkl"], "batch": [1, 64, 10_000]})
+def predict_proba(model, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        pkl, npz = _model_files(Path(tmp))
+        server = ModelServer(npz if model == "npz" else pkl)
+        X = synthetic_iris(batch, seed=7)[server.features].to_numpy()
+        yield lambda: server.predict_proba(X)
+
+
+@benchmark("serving", params={"concurrent": [1000]}, repeat=3)
+def micro_batcher(concurrent):
+    with tempfile.TemporaryDirectory() as tmp:
+        _, npz = _model_files(Path(tmp))
+        server = ModelServer(npz)
+    rows = synthetic_iris(concurrent, seed=7)[server.features].to_numpy()
+
+    async def burst():
+        batcher = MicroBatcher(server.predict_proba, max_batch_size=64, max_wait_ms=2.0)
+        await batcher.start()
+        try:
+            await asyncio.gather(*(batcher.submit(row) for row in rows))
+        finally:
+            await batcher.stop()
+
+    yield lambda: asyncio.run(burst())
@@ -0,0 +1,151 @@
+""" Registry, timing loop and result files of the benchmark suite.
+
+A benchmark is a generator function decorated with @benchmark: the code
+before its yield is setup, the yielded zero-argument callable is what gets
+timed, and the code after the yield (or the exit of a with block around
+it) is teardown. Parameters given as lists are expanded into one case per
+combination:
+
+    @benchmark("guardrails", params={"corpus": ["short", "long"]})
+    def redact_pii(corpus):
+        texts = text_corpus(corpus)
+        yield lambda: [guardrails.redact_pii(t) for t in texts]
+"""
+import gc
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class Benchmark:
+    group: str
+    name: str
+    fn: Callable[..., Iterator[Callable[[], Any]]]
+    params: Dict[str, List[Any]] = field(default_factory=dict)
+    repeat: int = 5
+    min_time: float = 0.1
+
+    def cases(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.params)
+        for values in itertools.product(*(self.params[n] for n in names)):
+            yield dict(zip(names, values))
+
+    def case_name(self, case: Dict[str, Any]) -> str:
+        name = f"{self.group}.{self.name}"
+        if case:
+            name += "[" + ",".join(f"{k}={v}" for k, v in case.items()) + "]"
+        return name
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(group: str, params: Optional[Dict[str, List[Any]]] = None, repeat: int = 5, min_time: float = 0.1):
+    """ Register a benchmark; repeat timings are taken, each of at least min_time seconds of calls """
+    def wrap(fn):
+        BENCHMARKS.append(Benchmark(group, fn.__name__, fn, dict(params or {}), repeat, min_time))
+        return fn
+    return wrap
+
+
+def _loops_for(workload: Callable[[], Any], min_time: float) -> int:
+    """ Calls per timing so that one timing lasts at least min_time, like timeit's autorange """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            workload()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return number
+        number = number * 10 if elapsed < min_time / 10 else number * 2
+
+
+def run_case(bench: Benchmark, case: Dict[str, Any]) -> Dict[str, Any]:
+    setup = bench.fn(**case)
+    try:
+        workload = next(setup)
+        number = _loops_for(workload, bench.min_time)
+        timings = []
+        for _ in range(bench.repeat):
+            gc.collect()
+            start = time.perf_counter()
+            for _ in range(number):
+                workload()
+            timings.append((time.perf_counter() - start) / number)
+    finally:
+        setup.close()
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "number": number,
+        "repeat": bench.repeat,
+    }
+
+
+def machine_info() -> Dict[str, Any]:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).strip().decode()
+    except Exception:
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def save_results(results: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """ Per-case ratio current / baseline of the fastest timing, for cases present in both runs.
+
+    The minimum is compared because it is the least affected by other load
+    on the machine; a ratio above threshold is a regression.
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+        ratio = result["min"] / base["min"] if base["min"] > 0 else float("inf")
+        rows.append({"name": name, "baseline": base["min"], "current": result["min"], "ratio": ratio,
+                     "regressed": ratio > threshold})
+    return rows
+
+
+def missing_cases(baseline: Dict[str, Any], current: Dict[str, Any], name_filter: str = "") -> List[str]:
+    """ Baseline cases the current run lacks, limited to names containing name_filter """
+    return sorted(name for name in baseline["benchmarks"]
+                  if name not in current["benchmarks"] and name_filter in name)
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
@@ -0,0 +1,98 @@
+""" Run the benchmark suite, store the results as JSON and compare against a baseline.
+
+    python benchmarks/run.py                                  # everything, results/<date>-<commit>.json
+    python benchmarks/run.py --filter guardrails.adversarial  # cases whose name contains the filter
+    python benchmarks/run.py --quick                          # pipeline data scaled down 10x
+    python benchmarks/run.py --compare benchmarks/results/baseline.json --threshold 1.5
+    python benchmarks/run.py --results new.json --compare old.json   # compare two stored runs
+
+--compare exits with status 1 when any case is slower than the baseline
+by more than the threshold factor, or when a baseline case is missing from
+the run (with --filter, only cases matching the filter have to be present).
+"""
+import argparse
+import importlib
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from harness import BENCHMARKS, compare, format_seconds, load_results, machine_info, missing_cases, run_case, save_results  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+MODULES = ["bench_guardrails", "bench_pipeline", "bench_serving"]
+
+
+def run_all(name_filter: str) -> dict:
+    for module in MODULES:
+        importlib.import_module(module)
+    results = {"meta": machine_info(), "benchmarks": {}}
+    for bench in BENCHMARKS:
+        for case in bench.cases():
+            name = bench.case_name(case)
+            if name_filter and name_filter not in name:
+                continue
+            result = run_case(bench, case)
+            results["benchmarks"][name] = result
+            print(f"{name:<78} {format_seconds(result['min'])}  (median {format_seconds(result['median']).strip()})", flush=True)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="scale the pipeline data sets down 10x")
+    parser.add_argument("--output", type=Path, help="results file, default results/<date>-<commit>.json")
+    parser.add_argument("--results", type=Path, help="compare this stored run instead of running the suite")
+    parser.add_argument("--compare", type=Path, help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="allowed slowdown factor before --compare fails")
+    parser.add_argument("--list", action="store_true", help="list the case names and exit")
+    args = parser.parse_args()
+
+    if args.quick:
+        #Read by the benchmark modules when they build their parameters
+        os.environ["BENCH_SCALE"] = "0.1"
+
+    if args.list:
+        for module in MODULES:
+            importlib.import_module(module)
+        for bench in BENCHMARKS:
+            for case in bench.cases():
+                print(bench.case_name(case))
+        return 0
+
+    if args.results:
+        results = load_results(args.results)
+    else:
+        results = run_all(args.filter)
+        meta = results["meta"]
+        output = args.output or RESULTS_DIR / f"{meta['created'][:19].replace(':', '')}-{meta['commit'][:8]}.json"
+        save_results(results, output)
+        print(f"[OK] Results written to {output}")
+
+    if not args.compare:
+        return 0
+    baseline = load_results(args.compare)
+    rows = compare(baseline, results, args.threshold)
+    regressions = [r for r in rows if r["regressed"]]
+    #A case that stopped running (renamed, crashed before timing) must not pass as "no regressions"
+    missing = missing_cases(baseline, results, args.filter)
+    print(f"\nCompared with {args.compare} ({len(rows)} common cases, threshold {args.threshold:.2f}x)")
+    for row in sorted(rows, key=lambda r: -r["ratio"]):
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(f"  {row['name']:<78} {format_seconds(row['baseline'])} -> {format_seconds(row['current'])}  {row['ratio']:6.2f}x {flag}")
+    for name in missing:
+        print(f"  {name:<78} MISSING")
+    if regressions or missing:
+        if regressions:
+            print(f"[FAIL] {len(regressions)} case(s) slower than {args.threshold:.2f}x the baseline")
+        if missing:
+            print(f"[FAIL] {len(missing)} baseline case(s) missing from this run")
+        return 1
+    print("[OK] No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+""" Replay a JSONL request log against the guardrail or the monitoring app.
+
+The log is streamed line by line, so its size does not matter. Every
+line is a JSON object; the fields used are
+
+    ts / timestamp / time   epoch seconds (or ms) or an ISO 8601 string
+    path                    endpoint, default /chat
+    body                    request JSON; when it is not an object the
+                            first of user_text / message / prompt / text /
+                            body / title becomes the chat message
+
+Pacing: --rate sends at a fixed rate, --original-timing keeps the gaps
+between the logged timestamps (scaled by --speed), otherwise requests go
+out as fast as --concurrency allows. In the paced modes latency counts
+from the intended send time, so a backed-up client shows up as latency
+instead of silently sending less (coordinated omission).
+
+Without --url the app is imported in-process and its LLM is replaced by
+the local deterministic stub of that app (stub_ollama / stub_openai) with
+--latency-ms per call. The report has throughput, p50/p95/p99 latency,
+the status / error mix and the guardrail decision mix; --output also
+writes it as JSON.
+
+    python replay.py requests.jsonl --app guardrail --rate 200 --latency-ms 20
+    python replay.py access.jsonl --app mlops --original-timing --speed 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent
+APPS = {
+    "guardrail": {"dir": ROOT / "Guardrail_Implementation_v2", "module": "app", "stub": "stub_ollama"},
+    "mlops": {"dir": ROOT / "MLOPS_Monitoring_v2" / "App", "module": "main", "stub": "stub_openai"},
+}
+DEFAULT_PATH = "/chat"
+TEXT_FIELDS = ("user_text", "message", "prompt", "text", "body", "title")
+TIME_FIELDS = ("ts", "timestamp", "time")
+
+Request = Tuple[Optional[float], str, Dict[str, Any]]
+
+
+def _timestamp(record: Dict[str, Any]) -> Optional[float]:
+    for field in TIME_FIELDS:
+        value = record.get(field)
+        if isinstance(value, (int, float)):
+            #Millisecond epochs are three orders of magnitude past any second epoch
+            return value / 1000.0 if value > 1e11 else float(value)
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                continue
+    return None
+
+
+def to_request(record: Dict[str, Any], app: str) -> Request:
+    """ (timestamp, path, JSON body) of one log record for the given app """
+    body = record.get("body")
+    if not isinstance(body, dict):
+        text = next((record[f] for f in TEXT_FIELDS if isinstance(record.get(f), str)), "")
+        if app == "guardrail":
+            body = {"user_text": text}
+        else:
+            body = {"user_id": str(record.get("user_id", "replay")), "message": text}
+    return _timestamp(record), record.get("path", DEFAULT_PATH), body
+
+
+def iter_log(path: Path, app: str, skipped: Counter) -> Iterator[Request]:
+    """ Requests of a JSONL log, read lazily; blank or malformed lines are counted in skipped """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped["malformed_line"] += 1
+                continue
+            if not isinstance(record, dict):
+                skipped["not_an_object"] += 1
+                continue
+            yield to_request(record, app)
+
+
+class LatencyHistogram:
+    """ Log-bucketed latencies (1% relative precision), constant memory however many requests are replayed """
+
+    def __init__(self, precision: float = 0.01, floor: float = 1e-6):
+        self._log_base = math.log1p(precision)
+        self._floor = floor
+        self.counts: Counter = Counter()
+        self.total = 0
+
+    def add(self, seconds: float) -> None:
+        self.counts[int(math.log(max(seconds, self._floor) / self._floor) / self._log_base)] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.total:
+            return math.nan
+        rank = math.ceil(q * self.total)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                #Middle of the bucket
+                return self._floor * math.exp((bucket + 0.5) * self._log_base)
+        return math.nan
+
+
+class ReplayStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.decisions: Counter = Counter()
+        self.skipped: Counter = Counter()
+        self.sent = 0
+        self.max_lag = 0.0
+        self.wall = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        completed = self.latency.total
+        return {
+            "sent": self.sent,
+            "completed": completed,
+            "wall_seconds": self.wall,
+            "throughput_rps": completed / self.wall if self.wall else 0.0,
+            "latency_ms": {f"p{int(q * 100)}": self.latency.quantile(q) * 1000 for q in (0.5, 0.95, 0.99)},
+            "max_schedule_lag_ms": self.max_lag * 1000,
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "decisions": dict(self.decisions),
+            "skipped_lines": dict(self.skipped),
+        }
+
+
+def _decision(resp: httpx.Response) -> Optional[str]:
+    """ Guardrail decision of a /chat JSON or /chat/stream NDJSON response """
+    try:
+        if resp.headers.get("content-type", "").startswith("application/x-ndjson"):
+            last = json.loads(resp.text.strip().rsplit("\n", 1)[-1])
+            return last.get("decision") or last.get("type")
+        payload = resp.json()
+    except ValueError:
+        return None
+    return payload.get("decision") if isinstance(payload, dict) else None
+
+
+async def _send(http: httpx.AsyncClient, path: str, body: Dict[str, Any], scheduled: float, stats: ReplayStats) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        resp = await http.post(path, json=body)
+    except Exception as e:
+        #Transport errors, and with the in-process transport anything the app raises, count as errors rather than aborting the replay
+        stats.errors[type(e).__name__] += 1
+        return
+    stats.latency.add(loop.time() - scheduled)
+    stats.statuses[resp.status_code] += 1
+    if resp.status_code >= 400:
+        stats.errors[f"http_{resp.status_code}"] += 1
+        return
+    decision = _decision(resp)
+    if decision is not None:
+        stats.decisions[decision] += 1
+
+
+async def replay(http: httpx.AsyncClient, requests: Iterator[Request], stats: ReplayStats, rate: Optional[float] = None,
+                 original_timing: bool = False, speed: float = 1.0, concurrency: int = 64, limit: Optional[int] = None) -> None:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+    first_ts = None
+    start = loop.time()
+
+    async def one(path: str, body: Dict[str, Any], scheduled: float) -> None:
+        try:
+            await _send(http, path, body, scheduled, stats)
+        finally:
+            slots.release()
+
+    for i, (ts, path, body) in enumerate(requests):
+        if limit is not None and i >= limit:
+            break
+        paced = True
+        if rate:
+            scheduled = start + i / rate
+        elif original_timing and ts is not None:
+            first_ts = ts if first_ts is None else first_ts
+            scheduled = start + max(ts - first_ts, 0.0) / speed
+        else:
+            paced = False
+        if paced and scheduled > loop.time():
+            await asyncio.sleep(scheduled - loop.time())
+        #Bounded in flight: when every slot is busy the replay falls behind schedule, which shows up as lag
+        await slots.acquire()
+        if paced:
+            stats.max_lag = max(stats.max_lag, loop.time() - scheduled)
+        else:
+            scheduled = loop.time()
+        stats.sent += 1
+        task = asyncio.create_task(one(path, body, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    stats.wall = loop.time() - start
+
+
+async def run(args: argparse.Namespace, stats: ReplayStats) -> None:
+    requests = iter_log(args.log, args.app, stats.skipped)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as http:
+            await replay(http, requests, stats, args.rate, args.original_timing, args.speed, args.concurrency, args.limit)
+        return
+
+    import importlib
+    module = importlib.import_module(APPS[args.app]["module"])
+    transport = httpx.ASGITransport(app=module.app)
+    async with module.app.router.lifespan_context(module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=args.timeout) as http:
+            await replay(http, requests, stats, args.rate, args.original_timing, args.speed, args.concurrency, args.limit)
+
+
+def print_report(report: Dict[str, Any], app: str) -> None:
+    latency = report["latency_ms"]
+    print(f"{app}: {report['completed']}/{report['sent']} requests in {report['wall_seconds']:.2f}s "
+          f"({report['throughput_rps']:.1f} req/s)")
+    print(f"latency p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, "
+          f"max schedule lag {report['max_schedule_lag_ms']:.1f} ms")
+    print(f"statuses {report['statuses']}")
+    print(f"errors {report['errors'] or 'none'}")
+    print(f"decisions {report['decisions'] or 'n/a'}")
+    if report["skipped_lines"]:
+        print(f"skipped lines {report['skipped_lines']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", type=Path, nargs="?", default=ROOT / "requests.jsonl", help="JSONL request log")
+    parser.add_argument("--app", choices=sorted(APPS), default="guardrail")
+    parser.add_argument("--url", help="replay against a running server instead of the in-process app and LLM stub")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="requests per second")
+    pacing.add_argument("--original-timing", action="store_true", help="keep the gaps between the logged timestamps")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression for --original-timing")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument("--limit", type=int, help="stop after this many requests")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="per-call latency of the LLM stub")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    stats = ReplayStats()
+    if args.url:
+        asyncio.run(run(args, stats))
+    else:
+        sys.path.insert(0, str(APPS[args.app]["dir"]))
+        import importlib
+        stub = importlib.import_module(APPS[args.app]["stub"])
+        with stub.StubServer(latency_ms=args.latency_ms) as stub_url:
+            #Read by the apps at import time
+            os.environ["OLLAMA_BASE_URL"] = stub_url
+            os.environ["LLM_BASE_URL"] = f"{stub_url}/v1"
+            os.environ.setdefault("OPENAI_API_KEY", "ollama")
+            asyncio.run(run(args, stats))
+
+    report = stats.report()
+    print_report(report, args.app)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+""" Benchmark CSV vs Parquet for the processed splits.
+
+Synthetic rows are drawn per class from the iris feature means / standard
+deviations and rounded to one decimal like the real data. For every size
+the script reports write time, file size, full read time and the time to
+read a single feature column.
+
+    python ./src/bench_data_format.py --rows 1000000 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_io import COLUMN_DTYPES, FEATURE_COLUMNS, TARGET_COLUMN, read_frame, write_frame
+
+#Per-class feature means and standard deviations of the iris data set
+CLASS_MEANS = np.array([
+    [5.006, 3.428, 1.462, 0.246],
+    [5.936, 2.770, 4.260, 1.326],
+    [6.588, 2.974, 5.552, 2.026],
+])
+CLASS_STDS = np.array([
+    [0.352, 0.379, 0.174, 0.105],
+    [0.516, 0.314, 0.470, 0.198],
+    [0.636, 0.322, 0.552, 0.275],
+])
+
+
+def synthetic_iris(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    target = rng.integers(0, len(CLASS_MEANS), size=rows)
+    values = rng.normal(CLASS_MEANS[target], CLASS_STDS[target])
+    values = np.clip(np.round(values, 1), 0.1, None)
+    df = pd.DataFrame(values, columns=FEATURE_COLUMNS)
+    df[TARGET_COLUMN] = target
+    return df.astype(COLUMN_DTYPES)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench(df: pd.DataFrame, directory: Path) -> None:
+    print(f"\n{len(df):,} rows")
+    print(f"  {'format':<8} {'write s':>9} {'size MB':>9} {'read s':>9} {'1 col s':>9}")
+    for fmt in ("csv", "parquet"):
+        path = directory / f"train.{fmt}"
+        write_s = timed(lambda: write_frame(df, path))
+        size_mb = os.path.getsize(path) / 1e6
+        read_s = timed(lambda: read_frame(path))
+        column_s = timed(lambda: read_frame(path, columns=[FEATURE_COLUMNS[2]]))
+        print(f"  {fmt:<8} {write_s:9.2f} {size_mb:9.1f} {read_s:9.2f} {column_s:9.2f}")
+        path.unlink()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            bench(synthetic_iris(rows), Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
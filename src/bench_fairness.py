@@ -0,0 +1,75 @@
+""" Benchmark the fairness grid search: cold serial fits vs warm-started, parallel and cached runs.
+
+Cold serial fitting is what a plain GridSearch does, one fresh fit per
+grid point. The data is synthetic iris (bench_data_format) with petal
+length banded into the sensitive groups, like the MLOPS demo. Warm
+starts must land on the same solutions as cold fits up to the solver
+tolerance: the script fails if more than 0.1% of the predictions differ
+at any grid point or the selected point's loss moves. Parallel runs must
+reproduce the serial warm-started fits exactly.
+
+    python ./src/bench_fairness.py --rows 200000 --grid-size 100 --workers 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_data_format import synthetic_iris
+from data_io import FEATURE_COLUMNS, TARGET_COLUMN
+from fairness import grid_search, group_codes, predict_fit
+
+SENSITIVE = 'petal length (cm)'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--grid-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = synthetic_iris(args.rows)
+    groups, _ = group_codes(df[SENSITIVE], [2.5, 5.0])
+    X = df[[c for c in FEATURE_COLUMNS if c != SENSITIVE]].to_numpy(dtype=np.float64)
+    y = (df[TARGET_COLUMN] == 2).to_numpy().astype(np.int64)
+
+    def run(**kwargs):
+        start = time.perf_counter()
+        results = grid_search(X, y, groups, grid_size=args.grid_size, **kwargs)
+        return sorted(results, key=lambda r: r["multipliers"]), results[0], time.perf_counter() - start
+
+    cold, cold_best, cold_s = run(workers=1, warm_start=False, cache_dir=None)
+    warm, warm_best, warm_s = run(workers=1, cache_dir=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        parallel, _, parallel_s = run(workers=args.workers, cache_dir=cache_dir)
+        _, _, cached_s = run(workers=args.workers, cache_dir=cache_dir)
+
+    #lbfgs stops within tol of the optimum, so rows right at the boundary may flip between cold and warm fits
+    flipped = max(float((predict_fit(c, X) != predict_fit(w, X)).mean()) for c, w in zip(cold, warm))
+    if flipped > 1e-3 or abs(cold_best["loss"] - warm_best["loss"]) > 1e-3:
+        print(f"[FAIL] warm-started fits differ from cold fits (up to {flipped:.2%} of predictions)")
+        return 1
+
+    #Warm starts follow fixed chains, so the worker count must not change a single coefficient
+    if any((p["coef"], p["intercept"]) != (w["coef"], w["intercept"]) for p, w in zip(parallel, warm)):
+        print(f"[FAIL] fits with {args.workers} workers differ from the serial warm-started fits")
+        return 1
+
+    cold_iter = sum(r["n_iter"] for r in cold)
+    warm_iter = sum(r["n_iter"] for r in warm)
+    print(f"{args.rows:,} rows, {len(cold)} grid points, best multipliers {cold_best['multipliers']}, "
+          f"at most {flipped:.3%} of predictions differ between cold and warm fits")
+    print(f"  cold serial           {cold_s:8.2f} s   {cold_iter:6d} solver iterations")
+    print(f"  warm serial           {warm_s:8.2f} s   {warm_iter:6d} solver iterations")
+    print(f"  warm, {args.workers:2d} workers     {parallel_s:8.2f} s")
+    print(f"  cached re-run         {cached_s:8.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
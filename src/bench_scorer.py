@@ -0,0 +1,143 @@
+""" Parity check and benchmark: exported NumPy scorer vs the sklearn pickle.
+
+Parity: predict must match exactly and predict_proba must be bit-for-bit
+identical on the test split and on random rows far outside the training
+range. A binary model is checked as well; its probabilities go through
+scipy's expit in sklearn, so there they may differ by an ulp. An
+incrementally trained model has its scaler folded into the coefficients
+and is allowed a few hundred ulps. Exits with status 1 on any mismatch.
+
+Benchmark: cold start (imports + load) and peak RSS are measured in a fresh
+interpreter for each path, throughput in-process at several batch sizes.
+
+    python ./src/bench_scorer.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from data_io import read_frame, split_path
+from fast_scorer import LinearScorer, export_linear_model
+
+MODEL_PATH = Path('./models/iris_logistics_regression.pkl')
+SCORER_PATH = Path('./models/iris_logistics_regression.npz')
+
+#ru_maxrss survives exec on Linux and would report the parent's size, VmHWM does not
+PEAK_RSS = """
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmHWM")) / 1024
+    except (OSError, StopIteration):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+"""
+
+SKLEARN_STARTUP = PEAK_RSS + """
+import time, json
+start = time.perf_counter()
+import joblib, pandas as pd
+model = joblib.load({path!r})
+model.predict_proba(pd.DataFrame([[5.1, 3.5, 1.4, 0.2]], columns=model.feature_names_in_))
+print(json.dumps({{"seconds": time.perf_counter() - start, "max_rss_mb": peak_rss_mb()}}))
+"""
+
+SCORER_STARTUP = PEAK_RSS + """
+import time, json, sys
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+from fast_scorer import LinearScorer
+scorer = LinearScorer.load({path!r})
+scorer.predict_proba([[5.1, 3.5, 1.4, 0.2]])
+print(json.dumps({{"seconds": time.perf_counter() - start, "max_rss_mb": peak_rss_mb()}}))
+"""
+
+
+def check_parity(model, scorer: LinearScorer, X: pd.DataFrame, label: str, max_ulps: int = 0) -> bool:
+    same_predict = np.array_equal(model.predict(X), scorer.predict(X))
+    max_diff = float(np.abs(model.predict_proba(X) - scorer.predict_proba(X)).max())
+    same_proba = max_diff <= max_ulps * np.finfo(np.float64).eps
+    status = "OK" if same_predict and same_proba else "FAIL"
+    print(f"[{status}] parity {label}: {len(X)} rows, predict equal={same_predict}, max predict_proba diff={max_diff:.3g}")
+    return same_predict and same_proba
+
+
+def random_rows(X: pd.DataFrame, n: int, seed: int = 0) -> pd.DataFrame:
+    """ Rows drawn well beyond the observed range, so saturated probabilities are covered too """
+    rng = np.random.default_rng(seed)
+    lo, hi = X.min().to_numpy(), X.max().to_numpy()
+    span = hi - lo
+    values = rng.uniform(lo - 3 * span, hi + 3 * span, size=(n, X.shape[1]))
+    return pd.DataFrame(values, columns=X.columns)
+
+
+def parity(model, scorer: LinearScorer, X: pd.DataFrame, y: pd.Series) -> bool:
+    max_ulps = 0 if isinstance(model, LogisticRegression) else 1024
+    ok = check_parity(model, scorer, X, "test split", max_ulps)
+    ok &= check_parity(model, scorer, random_rows(X, 20_000), "random rows", max_ulps)
+    binary = LogisticRegression(max_iter=200).fit(X, (y == y.iloc[0]).astype(int))
+    with tempfile.TemporaryDirectory() as tmp:
+        binary_scorer = LinearScorer.load(export_linear_model(binary, Path(tmp) / 'binary.npz'))
+    ok &= check_parity(binary, binary_scorer, random_rows(X, 20_000, seed=1), "binary model", max_ulps=2)
+    return ok
+
+
+def startup(script: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def throughput(fn, X, seconds: float = 1.0) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(X)
+        calls += 1
+    return calls * len(X) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skip-bench", action="store_true", help="only run the parity check")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    scorer = LinearScorer.load(SCORER_PATH)
+    test_df = read_frame(split_path('test'))
+    X, y = test_df.drop(columns=['target']), test_df['target']
+    if not parity(model, scorer, X, y):
+        return 1
+    if args.skip_bench:
+        return 0
+
+    src = str(Path(__file__).resolve().parent)
+    cold = {
+        "sklearn pickle": startup(SKLEARN_STARTUP.format(path=str(MODEL_PATH.resolve()))),
+        "numpy scorer": startup(SCORER_STARTUP.format(src=src, path=str(SCORER_PATH.resolve()))),
+    }
+    print("\ncold start (imports + load + first prediction) in a fresh interpreter")
+    for name, result in cold.items():
+        print(f"  {name:<15} {result['seconds'] * 1000:8.1f} ms   peak RSS {result['max_rss_mb']:7.1f} MB")
+
+    print("\nthroughput, predict_proba rows/s")
+    features = X.columns
+    for batch in (1, 64, 10_000):
+        rows = random_rows(X, batch, seed=2)
+        values = rows.to_numpy()
+        sk = throughput(lambda v: model.predict_proba(pd.DataFrame(v, columns=features)), values)
+        fast = throughput(scorer.predict_proba, values)
+        print(f"  batch {batch:>6}: sklearn {sk:14,.0f}   numpy {fast:14,.0f}   ({fast / sk:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
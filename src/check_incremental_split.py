@@ -0,0 +1,87 @@
+""" Check that appending raw rows reaches train_model as a pure delta.
+
+In a scratch directory: split a synthetic raw file, train in full, append
+rows to the raw file, split again and run an incremental update. With
+the append-stable split, both prepare modes and both formats must leave
+the earlier train rows in place, so train_incremental updates on exactly
+the appended train rows instead of falling back to a full retrain. A second incremental run with
+nothing new must leave the retrain schedule alone.
+
+    python ./src/check_incremental_split.py --rows 20000 --append 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+import prepare_data
+import train_model
+from bench_data_format import synthetic_iris
+from data_io import FORMATS, read_frame, split_path
+from incremental import delta_start, fingerprint, load_state
+
+
+def _quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _split(mode: str, fmt: str) -> None:
+    if mode == 'streaming':
+        #Small chunks so the check also covers rows split across chunk boundaries
+        prepare_data.prepare_data_streaming(fmt, chunk_rows=997, split='append-stable')
+    else:
+        prepare_data.prepare_data(fmt, 'append-stable')
+
+
+def check(mode: str, fmt: str, rows: int, append: int) -> None:
+    raw = synthetic_iris(rows + append, seed=7)
+    raw_path = prepare_data.RAW_DATA_PATH
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    raw.iloc[:rows].to_csv(raw_path, index=False)
+    _split(mode, fmt)
+    before = read_frame(split_path('train', fmt))
+    _quiet(train_model.main, fmt, 'incremental')
+
+    raw.iloc[rows:].to_csv(raw_path, mode='a', header=False, index=False)
+    _split(mode, fmt)
+    after = read_frame(split_path('train', fmt))
+    assert delta_start(fingerprint(before), after) == len(before), f"{mode}/{fmt}: earlier train rows moved"
+    pd.testing.assert_frame_equal(after.iloc[:len(before)], before)
+
+    _quiet(train_model.main, fmt, 'incremental')
+    metrics = pd.read_json(train_model.METRICS_DIR / 'metrics.json', typ='series')
+    assert metrics['training_mode'] == 'incremental', f"{mode}/{fmt}: {metrics['full_retrain_reason']}"
+    assert metrics['rows_processed'] == len(after) - len(before)
+    assert load_state()['updates_since_full'] == 1
+
+    _quiet(train_model.main, fmt, 'incremental')
+    assert load_state()['updates_since_full'] == 1, f"{mode}/{fmt}: an empty delta counted as an update"
+    print(f"[OK] {mode}/{fmt}: {len(after) - len(before)} appended train rows trained incrementally")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--append", type=int, default=500)
+    args = parser.parse_args()
+
+    previous_cwd = os.getcwd()
+    #train_model records the commit, point git at this checkout from the scratch directories
+    os.environ.setdefault('GIT_DIR', str(Path(__file__).resolve().parents[1] / '.git'))
+    for mode in ('memory', 'streaming'):
+        for fmt in FORMATS:
+            with tempfile.TemporaryDirectory(prefix='check-incremental-') as tmp:
+                os.chdir(tmp)
+                try:
+                    check(mode, fmt, args.rows, args.append)
+                finally:
+                    os.chdir(previous_cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Check that the streaming split is stratified exactly like the in-memory one.
+
+In a scratch directory: split a synthetic raw file with uneven classes in
+memory (train_test_split) and in streaming mode at several chunk sizes,
+for both formats. Every run must put the same number of rows of each
+class in train and test, the streaming splits must be identical across
+chunk sizes and repeated runs, and a different random_state must still
+keep the class counts while picking other rows.
+
+    python ./src/check_stratified_split.py --rows 20011
+"""
+import argparse
+import os
+import tempfile
+from typing import Dict, Tuple
+
+import pandas as pd
+
+import prepare_data
+from bench_data_format import synthetic_iris
+from data_io import FORMATS, TARGET_COLUMN, read_frame, split_path
+
+CHUNK_SIZES = (997, 4096, 1_000_000)
+
+
+def _class_counts(fmt: str) -> Tuple[Dict, Dict]:
+    return tuple(read_frame(split_path(name, fmt))[TARGET_COLUMN].value_counts().sort_index().to_dict()
+                 for name in ('train', 'test'))
+
+
+def _streamed(fmt: str, chunk_rows: int, random_state: int = prepare_data.RANDOM_STATE) -> pd.DataFrame:
+    prepare_data.prepare_data_streaming(fmt, chunk_rows=chunk_rows, random_state=random_state)
+    test = read_frame(split_path('test', fmt))
+    return test.sort_values(list(test.columns), ignore_index=True)
+
+
+def check(fmt: str, rows: int) -> None:
+    raw = synthetic_iris(rows, seed=11)
+    #Uneven classes, so the quotas have remainders to round like train_test_split does
+    raw = raw.drop(raw.index[raw[TARGET_COLUMN] == 2][: rows // 7])
+    raw_path = prepare_data.RAW_DATA_PATH
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    raw.to_csv(raw_path, index=False)
+
+    prepare_data.prepare_data(fmt)
+    expected = _class_counts(fmt)
+
+    first = None
+    for chunk_rows in CHUNK_SIZES:
+        test = _streamed(fmt, chunk_rows)
+        assert _class_counts(fmt) == expected, f"{fmt}/{chunk_rows}: {_class_counts(fmt)} != in-memory {expected}"
+        if first is None:
+            first = test
+        pd.testing.assert_frame_equal(test, first, obj=f"{fmt}: test split with chunk_rows={chunk_rows}")
+    pd.testing.assert_frame_equal(_streamed(fmt, CHUNK_SIZES[0]), first, obj=f"{fmt}: repeated run")
+
+    other = _streamed(fmt, CHUNK_SIZES[0], random_state=prepare_data.RANDOM_STATE + 1)
+    assert _class_counts(fmt) == expected, f"{fmt}: class counts depend on random_state"
+    assert not other.equals(first), f"{fmt}: random_state does not change the split"
+    print(f"[OK] {fmt}: streaming matches the in-memory class counts {expected[1]} for chunk sizes {CHUNK_SIZES}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_011)
+    args = parser.parse_args()
+
+    previous_cwd = os.getcwd()
+    for fmt in FORMATS:
+        with tempfile.TemporaryDirectory(prefix='check-stratified-') as tmp:
+            os.chdir(tmp)
+            try:
+                check(fmt, args.rows)
+            finally:
+                os.chdir(previous_cwd)
+
+
+if __name__ == "__main__":
+    main()
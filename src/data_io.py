@@ -0,0 +1,115 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+PROCESSED_DIR = Path('./data/processed/')
+FORMATS = ("csv", "parquet")
+#Used when a stage is run without --format, the DVC pipeline passes params.yaml's data.format
+DEFAULT_FORMAT = os.getenv('DATA_FORMAT', 'csv')
+
+FEATURE_COLUMNS = [
+    "sepal length (cm)",
+    "sepal width (cm)",
+    "petal length (cm)",
+    "petal width (cm)",
+]
+TARGET_COLUMN = "target"
+
+#Typed columns for Parquet; CSV readers get the same dtypes explicitly
+COLUMN_DTYPES = {**{c: "float64" for c in FEATURE_COLUMNS}, TARGET_COLUMN: "int64"}
+
+
+def split_path(name: str, fmt: str = DEFAULT_FORMAT, directory: Path = PROCESSED_DIR) -> Path:
+    """ Location of a processed split, e.g. split_path("train", "parquet") -> data/processed/train.parquet """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown data format {fmt!r}, expected one of {FORMATS}")
+    return directory / f"{name}.{fmt}"
+
+
+def _format_of(path: Path) -> str:
+    return "parquet" if path.suffix == ".parquet" else "csv"
+
+
+def columns_of(path: Path) -> List[str]:
+    """ Column names without reading any rows """
+    if _format_of(path) == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def write_frame(df: pd.DataFrame, path: Path) -> None:
+    if _format_of(path) == "parquet":
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.to_csv(path, index=False)
+
+
+def read_frame(path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """ Read a split, only materialising `columns` when given.
+
+    Parquet is memory-mapped and column-pruned, so unused columns are never
+    decoded; CSV still has to tokenize every line but skips converting the rest.
+    """
+    if _format_of(path) == "parquet":
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    dtypes = {c: t for c, t in COLUMN_DTYPES.items() if columns is None or c in columns}
+    return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+
+def iter_chunks(
+    path: Path, chunk_rows: int, dtypes: Optional[Dict[str, str]] = None, columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """ Stream a file as DataFrames of at most chunk_rows rows, cast to dtypes and limited to columns """
+    if dtypes and columns is not None:
+        dtypes = {c: t for c, t in dtypes.items() if c in columns}
+    if _format_of(path) == "parquet":
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            chunk = batch.to_pandas()
+            yield chunk.astype(dtypes) if dtypes else chunk
+    else:
+        yield from pd.read_csv(path, dtype=dtypes, usecols=columns, chunksize=chunk_rows)
+
+
+class ChunkWriter:
+    """ Append DataFrames to one CSV or Parquet file without holding them all in memory.
+
+    Every chunk must have the same columns and dtypes as the first one.
+    Use as a context manager so the Parquet footer is written on exit.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty and self._started:
+            return
+        if _format_of(self.path) == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, index=False, mode="a" if self._started else "w", header=not self._started)
+        self._started = True
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,320 @@
+""" Demographic parity mitigation by grid search over Lagrange multipliers.
+
+The reductions approach (as in fairlearn's GridSearch): every grid point
+is a vector of multipliers, one per sensitive group, and turns the
+constrained problem into a reweighted, relabelled classification problem
+that the base LogisticRegression solves (the oracle fit). The point whose
+classifier has the best error / disparity trade-off on the training data
+wins.
+
+Oracle fits run in a process pool. One nearest-neighbour path through the
+whole grid is cut into fixed chains of neighbouring points, and every fit
+is warm-started from the fit just before it on its chain, since nearby
+multipliers give nearly the same problem. A point's warm start therefore
+never depends on the worker count or on which points were cached, and
+neither does its fit. Fits are cached on disk per (multipliers, data hash, estimator
+params), so nightly re-runs on unchanged data cost nothing and a larger
+grid only fits the new points. The prepared splits are read through
+data_io, nothing is re-split.
+
+    python ./src/fairness.py --format parquet --sensitive "petal length (cm)" --bins 2.5,5.0 --positive-class 2
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.linear_model import LogisticRegression
+
+from data_io import DEFAULT_FORMAT, FEATURE_COLUMNS, FORMATS, TARGET_COLUMN, read_frame, split_path
+from fast_scorer import export_linear_model
+from sweep import data_hash
+
+FAIRNESS_DIR = Path('./fairness/')
+CACHE_DIR = FAIRNESS_DIR / 'cache'
+GRID_PATH = FAIRNESS_DIR / 'grid.json'
+MODEL_PATH = Path('./models/iris_fair_model.pkl')
+METRICS_PATH = Path('./metrics/fairness.json')
+
+GRID_SIZE = 100
+GRID_LIMIT = 2.0
+#Weight of the disparity against the error rate when picking the best grid point
+CONSTRAINT_WEIGHT = 0.5
+#lbfgs honours warm_start, liblinear silently ignores it
+ESTIMATOR_PARAMS = {"solver": "lbfgs", "C": 1.0, "max_iter": 1000, "tol": 1e-6}
+#Grid points per warm-start chain, the unit of work handed to a worker
+WARM_START_RUN = 10
+
+
+def group_codes(values: pd.Series, bins: Optional[Sequence[float]] = None, categories: Optional[Sequence] = None):
+    """ Integer group per row and the group labels; continuous columns are cut at the given inner bin edges """
+    if bins:
+        edges = [-np.inf, *sorted(bins), np.inf]
+        values = pd.cut(values, bins=edges)
+        categories = list(values.cat.categories) if categories is None else categories
+    elif categories is None:
+        categories = sorted(values.dropna().unique().tolist())
+    codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+    if (codes < 0).any():
+        raise ValueError("Sensitive column has missing values or groups not seen in training")
+    return codes, list(categories)
+
+
+def multiplier_grid(n_groups: int, grid_size: int = GRID_SIZE, grid_limit: float = GRID_LIMIT) -> np.ndarray:
+    """ grid_size multiplier vectors, shape (grid_size, n_groups).
+
+    The first group is the reference and keeps multiplier 0 (shifting all
+    of them together adds nothing). The others take the grid_size integer
+    lattice points closest to the origin in L1 norm, scaled so the largest
+    coordinate is grid_limit; with two groups that is an even spacing of
+    [-grid_limit, grid_limit].
+    """
+    dims = n_groups - 1
+    if dims == 0:
+        return np.zeros((1, n_groups))
+    radius = max(1, int(np.ceil((grid_size ** (1 / dims) - 1) / 2)))
+    while (2 * radius + 1) ** dims < grid_size:
+        radius += 1
+    lattice = sorted(itertools.product(range(-radius, radius + 1), repeat=dims), key=lambda p: (sum(map(abs, p)), p))
+    points = np.array(lattice[:grid_size], dtype=np.float64)
+    points *= grid_limit / max(np.abs(points).max(), 1.0)
+    return np.hstack([np.zeros((len(points), 1)), points])
+
+
+def reduction(y: np.ndarray, groups: np.ndarray, group_probs: np.ndarray, multipliers: np.ndarray):
+    """ Relabelled targets and sample weights of the cost-sensitive problem for one multiplier vector.
+
+    Predicting 1 for a row costs (1 - 2y) for the error term plus
+    multiplier/P(group) - sum(multipliers) for the parity term. The oracle
+    learns to predict 1 where that cost is negative, weighted by its size.
+    """
+    signed = (2 * y - 1) + multipliers.sum() - (multipliers / group_probs)[groups]
+    return (signed > 0).astype(np.int64), np.abs(signed)
+
+
+def oracle_fit(X: np.ndarray, y: np.ndarray, groups: np.ndarray, group_probs: np.ndarray, multipliers: np.ndarray,
+               params: Dict[str, Any], init: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """ Fit the base estimator for one grid point, starting from init's coefficients if given """
+    y_reduced, weights = reduction(y, groups, group_probs, multipliers)
+    labels = np.unique(y_reduced)
+    if len(labels) == 1:
+        #Every row wants the same label, the best response is a constant classifier
+        return {"constant": int(labels[0]), "coef": None, "intercept": None, "n_iter": 0}
+    model = LogisticRegression(warm_start=True, **params)
+    if init is not None and init["coef"] is not None:
+        model.coef_ = np.array(init["coef"])
+        model.intercept_ = np.array(init["intercept"])
+    model.fit(X, y_reduced, sample_weight=weights)
+    return {"constant": None, "coef": model.coef_.tolist(), "intercept": model.intercept_.tolist(),
+            "n_iter": int(model.n_iter_[0])}
+
+
+def predict_fit(fit: Dict[str, Any], X: np.ndarray) -> np.ndarray:
+    if fit["constant"] is not None:
+        return np.full(len(X), fit["constant"], dtype=np.int64)
+    scores = X @ np.asarray(fit["coef"]).T + np.asarray(fit["intercept"])
+    return (scores[:, 0] > 0).astype(np.int64)
+
+
+def to_estimator(fit: Dict[str, Any], features: List[str], params: Dict[str, Any] = ESTIMATOR_PARAMS) -> LogisticRegression:
+    """ Fitted LogisticRegression for a cached oracle fit, so it can be pickled and exported like any other """
+    if fit["constant"] is not None:
+        raise ValueError("Grid point was solved by a constant classifier, there is no linear model to build")
+    model = LogisticRegression(**params)
+    model.coef_ = np.array(fit["coef"])
+    model.intercept_ = np.array(fit["intercept"])
+    model.classes_ = np.array([0, 1])
+    model.n_features_in_ = model.coef_.shape[1]
+    model.feature_names_in_ = np.array(features, dtype=object)
+    model.n_iter_ = np.array([fit["n_iter"]])
+    return model
+
+
+def parity_difference(preds: np.ndarray, groups: np.ndarray, n_groups: int) -> float:
+    """ Largest gap between a group's selection rate and the overall one """
+    counts = np.bincount(groups, minlength=n_groups)
+    rates = np.bincount(groups, weights=preds, minlength=n_groups)[counts > 0] / counts[counts > 0]
+    return float(np.abs(rates - preds.mean()).max())
+
+
+def cache_key(multipliers: np.ndarray, dataset: str, params: Dict[str, Any], warm_start_run: int = WARM_START_RUN) -> str:
+    raw = json.dumps({"multipliers": [round(float(m), 12) for m in multipliers], "data": dataset,
+                      "estimator": params, "warm_start_run": warm_start_run, "sklearn": sklearn.__version__}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def walk_order(points: np.ndarray) -> List[int]:
+    """ Greedy nearest-neighbour path through the points, starting from the one closest to the origin """
+    remaining = list(range(len(points)))
+    order = [remaining.pop(int(np.argmin(np.abs(points).sum(axis=1))))]
+    while remaining:
+        distances = np.abs(points[remaining] - points[order[-1]]).sum(axis=1)
+        order.append(remaining.pop(int(np.argmin(distances))))
+    return order
+
+
+#Training data handed to each worker once by the pool initializer instead of with every task
+_X: Optional[np.ndarray] = None
+_y: Optional[np.ndarray] = None
+_groups: Optional[np.ndarray] = None
+_group_probs: Optional[np.ndarray] = None
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, groups: np.ndarray, group_probs: np.ndarray) -> None:
+    global _X, _y, _groups, _group_probs
+    _X, _y, _groups, _group_probs = X, y, groups, group_probs
+
+
+def _fit_run(run: List[List[float]], cached: List[Optional[Dict[str, Any]]], params: Dict[str, Any],
+             warm_start: bool) -> List[Optional[Dict[str, Any]]]:
+    """ Fit the uncached points of one chain in order, each warm-started from the last linear fit before it.
+
+    cached holds the fits already known for the chain; their slots come back as None.
+    """
+    fits: List[Optional[Dict[str, Any]]] = []
+    previous = None
+    for multipliers, fit in zip(run, cached):
+        if fit is None:
+            start = time.perf_counter()
+            fit = oracle_fit(_X, _y, _groups, _group_probs, np.asarray(multipliers), params, previous if warm_start else None)
+            fit.update(multipliers=list(multipliers), fit_seconds=time.perf_counter() - start)
+            fits.append(fit)
+        else:
+            fits.append(None)
+        if fit["coef"] is not None:
+            previous = fit
+    return fits
+
+
+def grid_search(X: np.ndarray, y: np.ndarray, groups: np.ndarray, grid_size: int = GRID_SIZE, grid_limit: float = GRID_LIMIT,
+                workers: int = 1, params: Dict[str, Any] = ESTIMATOR_PARAMS, cache_dir: Optional[Path] = CACHE_DIR,
+                warm_start: bool = True, constraint_weight: float = CONSTRAINT_WEIGHT) -> List[Dict[str, Any]]:
+    """ Oracle fits for every grid point with their training error and parity difference, best first.
+
+    X is the feature matrix without the sensitive column, y a 0/1 label
+    and groups the integer group of each row. cache_dir=None disables the
+    cache.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    n_groups = int(groups.max()) + 1
+    group_probs = np.bincount(groups, minlength=n_groups) / len(groups)
+    grid = multiplier_grid(n_groups, grid_size, grid_limit)
+
+    dataset = data_hash(pd.DataFrame(np.column_stack([X, y, groups])))
+    keys = [cache_key(m, dataset, params, WARM_START_RUN if warm_start else 1) for m in grid]
+    fits: Dict[str, Dict[str, Any]] = {}
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for key in keys:
+            path = cache_dir / f"{key}.json"
+            if path.exists():
+                with open(path) as f:
+                    fits[key] = {**json.load(f), "cached": True}
+
+    if len(fits) < len(keys):
+        #Chains are cut from a path over the whole grid, not just the pending points, so they never depend on the cache
+        order = walk_order(grid)
+        runs = [order[i:i + WARM_START_RUN] for i in range(0, len(order), WARM_START_RUN)]
+        runs = [run for run in runs if any(keys[i] not in fits for i in run)]
+        tasks = [([grid[i].tolist() for i in run], [fits.get(keys[i]) for i in run], params, warm_start) for run in runs]
+        if workers <= 1 or len(runs) == 1:
+            _init_worker(X, y, groups, group_probs)
+            results = [_fit_run(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(runs)), initializer=_init_worker,
+                                     initargs=(X, y, groups, group_probs)) as pool:
+                results = list(pool.map(_fit_run, *zip(*tasks)))
+        for run, run_fits in zip(runs, results):
+            for i, fit in zip(run, run_fits):
+                if fit is None:
+                    continue
+                if cache_dir is not None:
+                    with open(cache_dir / f"{keys[i]}.json", "w") as f:
+                        json.dump(fit, f)
+                fits[keys[i]] = {**fit, "cached": False}
+
+    results = []
+    for key in keys:
+        fit = fits[key]
+        preds = predict_fit(fit, X)
+        error = float((preds != y).mean())
+        disparity = parity_difference(preds, groups, n_groups)
+        results.append({**fit, "error": error, "parity_difference": disparity,
+                        "loss": constraint_weight * disparity + (1 - constraint_weight) * error})
+    return sorted(results, key=lambda r: r["loss"])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="storage format of the processed splits")
+    parser.add_argument("--sensitive", required=True, help="sensitive column, dropped from the model features")
+    parser.add_argument("--bins", default="", help="comma separated inner bin edges for a continuous sensitive column")
+    parser.add_argument("--positive-class", type=int, default=2, help="target class treated as the positive outcome")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE)
+    parser.add_argument("--grid-limit", type=float, default=GRID_LIMIT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    bins = [float(b) for b in args.bins.split(',') if b.strip()]
+    columns = FEATURE_COLUMNS + [TARGET_COLUMN] + ([args.sensitive] if args.sensitive not in FEATURE_COLUMNS else [])
+    train_df = read_frame(split_path('train', args.format), columns=columns)
+    test_df = read_frame(split_path('test', args.format), columns=columns)
+    features = [c for c in FEATURE_COLUMNS if c != args.sensitive]
+
+    train_groups, categories = group_codes(train_df[args.sensitive], bins)
+    test_groups, _ = group_codes(test_df[args.sensitive], bins, categories)
+    X_train = train_df[features].to_numpy(dtype=np.float64)
+    y_train = (train_df[TARGET_COLUMN] == args.positive_class).to_numpy().astype(np.int64)
+    X_test = test_df[features].to_numpy(dtype=np.float64)
+    y_test = (test_df[TARGET_COLUMN] == args.positive_class).to_numpy().astype(np.int64)
+
+    start = time.perf_counter()
+    results = grid_search(X_train, y_train, train_groups, args.grid_size, args.grid_limit, args.workers)
+    elapsed = time.perf_counter() - start
+    best = results[0]
+
+    preds = predict_fit(best, X_test)
+    metrics = {
+        "sensitive": args.sensitive,
+        "groups": [str(c) for c in categories],
+        "positive_class": args.positive_class,
+        "multipliers": best["multipliers"],
+        "test_accuracy": float((preds == y_test).mean()),
+        "test_parity_difference": parity_difference(preds, test_groups, len(categories)),
+        "train_error": best["error"],
+        "train_parity_difference": best["parity_difference"],
+        "grid_seconds": elapsed,
+        "fits_computed": sum(not r["cached"] for r in results),
+    }
+
+    FAIRNESS_DIR.mkdir(parents=True, exist_ok=True)
+    METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(GRID_PATH, "w") as f:
+        json.dump(results, f, indent=2)
+    with open(METRICS_PATH, "w") as f:
+        json.dump(metrics, f, indent=2)
+    if best["constant"] is None:
+        MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+        model = to_estimator(best, features)
+        joblib.dump(model, MODEL_PATH)
+        export_linear_model(model, MODEL_PATH.with_suffix('.npz'))
+
+    print(f"[OK] Grid of {len(results)} points ({metrics['fits_computed']} fitted, {len(results) - metrics['fits_computed']} cached) in {elapsed:.1f}s")
+    print(f"[OK] Best multipliers {best['multipliers']}: test accuracy {metrics['test_accuracy']:.4f}, "
+          f"parity difference {metrics['test_parity_difference']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
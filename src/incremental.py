@@ -0,0 +1,81 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+STATE_PATH = Path('./models/train_state.json')
+BLOCK_ROWS = 65_536
+STATE_VERSION = 1
+
+
+def make_sgd_model(random_state: int = 42) -> Pipeline:
+    """ Logistic model that can be updated with partial_fit """
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('sgd', SGDClassifier(loss='log_loss', alpha=1e-4, max_iter=1000, tol=1e-4, random_state=random_state)),
+    ])
+
+
+def fingerprint(df: pd.DataFrame, block_rows: int = BLOCK_ROWS) -> Dict[str, Any]:
+    """ Content hashes of every full block of block_rows rows, plus one of the trailing partial block """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    full = len(row_hashes) // block_rows
+    blocks = [
+        hashlib.blake2b(row_hashes[i * block_rows:(i + 1) * block_rows].tobytes(), digest_size=16).hexdigest()
+        for i in range(full)
+    ]
+    tail = hashlib.blake2b(row_hashes[full * block_rows:].tobytes(), digest_size=16).hexdigest()
+    return {
+        'rows': len(row_hashes),
+        'block_rows': block_rows,
+        'block_hashes': blocks,
+        'tail_hash': tail,
+        'columns': list(df.columns),
+    }
+
+
+def delta_start(previous: Dict[str, Any], df: pd.DataFrame) -> Optional[int]:
+    """ Row offset where new rows begin, or None if rows the model already saw were changed.
+
+    The training file is treated as append-only: every block fingerprinted
+    last time must still be there, unchanged and in the same place.
+    """
+    rows = previous['rows']
+    if list(df.columns) != previous['columns'] or len(df) < rows:
+        return None
+    current = fingerprint(df.iloc[:rows], previous['block_rows'])
+    if current['block_hashes'] != previous['block_hashes'] or current['tail_hash'] != previous['tail_hash']:
+        return None
+    return rows
+
+
+def partial_update(model: Pipeline, X: pd.DataFrame, y: pd.Series, classes: List) -> None:
+    """ One incremental SGD pass on new rows.
+
+    The scaler keeps the statistics of the last full fit: the SGD weights
+    were learned on that scaling, so refreshing it would silently change
+    what they mean. It is refit at the next full retrain.
+    """
+    scaler = model.named_steps['scaler']
+    model.named_steps['sgd'].partial_fit(scaler.transform(X), y, classes=np.asarray(classes))
+
+
+def load_state(path: Path = STATE_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def save_state(state: Dict[str, Any], path: Path = STATE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({**state, 'version': STATE_VERSION}, f)
@@ -1,24 +1,197 @@
+import argparse
+import math
+from typing import Dict, Tuple
+
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from pathlib import Path
 
+from data_io import (COLUMN_DTYPES, DEFAULT_FORMAT, FORMATS, PROCESSED_DIR, TARGET_COLUMN, ChunkWriter, iter_chunks,
+                     split_path, write_frame)
+
 RAW_DATA_PATH = Path('./data/raw/iris.csv')
-PROCESSED_DIR = Path('./data/processed/')
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+CHUNK_ROWS = 1_000_000
+#Rows are ranked inside 2**16 hash buckets per class, only the bucket straddling the quota is buffered
+HASH_BUCKET_BITS = 16
+#stratified matches train_test_split's per-class quotas; append-stable keeps earlier rows in place when raw rows are appended
+SPLITS = ("stratified", "append-stable")
 
-def prepare_data():
+def prepare_data(fmt: str = DEFAULT_FORMAT, split: str = "stratified", test_size: float = TEST_SIZE,
+                 random_state: int = RANDOM_STATE):
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-    df = pd.read_csv(RAW_DATA_PATH)
-    
-    train_df, test_df = train_test_split(
-        df, 
-        test_size=0.2, 
-        random_state=42,
-        stratify=df['target']
-        )
-    
-    train_df.to_csv(PROCESSED_DIR / 'train.csv', index=False)
-    test_df.to_csv(PROCESSED_DIR / 'test.csv', index=False)
+    df = pd.read_csv(RAW_DATA_PATH, dtype=COLUMN_DTYPES)
+
+    if split == "append-stable":
+        #Row order is kept so the splits only ever grow at the end
+        is_test = holdout_mask(0, len(df), test_size, random_state)
+        train_df, test_df = df[~is_test], df[is_test]
+    else:
+        train_df, test_df = train_test_split(
+            df,
+            test_size=test_size,
+            random_state=random_state,
+            stratify=df['target']
+            )
+
+    write_frame(train_df, split_path('train', fmt))
+    write_frame(test_df, split_path('test', fmt))
+
+def row_hashes(start: int, n: int, seed: int) -> np.ndarray:
+    """ splitmix64 of (seed, global row index): a fixed pseudo-random rank per row, independent of chunking """
+    with np.errstate(over='ignore'):
+        z = np.arange(start, start + n, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+def holdout_mask(start: int, n: int, test_size: float = TEST_SIZE, random_state: int = RANDOM_STATE) -> np.ndarray:
+    """ True for the rows that go to test.
+
+    A row's side depends only on its own index and random_state, never on
+    how many rows the file has, so appending raw rows leaves every earlier
+    assignment alone and the new rows land at the end of train and test:
+    incremental training sees them as a pure delta. Each class gets
+    test_size of its rows in expectation rather than an exact quota, so
+    this is opt-in (split="append-stable") rather than the default.
+    """
+    threshold = np.uint64(min(int(test_size * 2**64), 2**64 - 1))
+    return row_hashes(start, n, random_state) < threshold
+
+def _approximate_mode(class_counts: np.ndarray, n_draws: int, rng: np.random.RandomState) -> np.ndarray:
+    """ Per-class allocation of n_draws rows, the same rule StratifiedShuffleSplit uses """
+    continuous = class_counts / class_counts.sum() * n_draws
+    floored = np.floor(continuous)
+    need_to_add = int(n_draws - floored.sum())
+    if need_to_add > 0:
+        remainder = continuous - floored
+        for value in np.sort(np.unique(remainder))[::-1]:
+            (inds,) = np.where(remainder == value)
+            add_now = min(len(inds), need_to_add)
+            floored[rng.choice(inds, size=add_now, replace=False)] += 1
+            need_to_add -= add_now
+            if need_to_add == 0:
+                break
+    return floored.astype(int)
+
+def class_quotas(class_counts: Dict, test_size: float, random_state: int) -> Dict:
+    """ Test rows per class, matching what train_test_split(stratify=...) would put in the test split """
+    classes = sorted(class_counts)
+    counts = np.array([class_counts[c] for c in classes])
+    n_samples = int(counts.sum())
+    n_test = math.ceil(test_size * n_samples)
+    n_train = n_samples - n_test
+    rng = np.random.RandomState(random_state)
+    n_i = _approximate_mode(counts, n_train, rng)
+    t_i = _approximate_mode(counts - n_i, n_test, rng)
+    return {c: int(t) for c, t in zip(classes, t_i)}
+
+def _count_buckets(raw_path: Path, chunk_rows: int, seed: int) -> Tuple[Dict, Dict]:
+    """ First pass over the target column only: class counts and per-class hash bucket histograms """
+    shift = np.uint64(64 - HASH_BUCKET_BITS)
+    counts: Dict = {}
+    histograms: Dict = {}
+    start = 0
+    for chunk in iter_chunks(raw_path, chunk_rows, COLUMN_DTYPES, columns=[TARGET_COLUMN]):
+        target = chunk[TARGET_COLUMN].to_numpy()
+        buckets = (row_hashes(start, len(target), seed) >> shift).astype(np.int64)
+        for cls in np.unique(target):
+            mask = target == cls
+            key = cls.item()
+            counts[key] = counts.get(key, 0) + int(mask.sum())
+            hist = np.bincount(buckets[mask], minlength=1 << HASH_BUCKET_BITS)
+            histograms[key] = histograms[key] + hist if key in histograms else hist
+        start += len(target)
+    return counts, histograms
+
+def _stream_append_stable(fmt: str, raw_path: Path, chunk_rows: int, test_size: float, random_state: int) -> Dict:
+    counts: Dict = {}
+    test_counts: Dict = {}
+    start = 0
+    with ChunkWriter(split_path('train', fmt)) as train_writer, ChunkWriter(split_path('test', fmt)) as test_writer:
+        for chunk in iter_chunks(raw_path, chunk_rows, COLUMN_DTYPES):
+            is_test = holdout_mask(start, len(chunk), test_size, random_state)
+            train_writer.write(chunk[~is_test])
+            test_writer.write(chunk[is_test])
+            for cls, n in chunk[TARGET_COLUMN].value_counts().items():
+                counts[cls] = counts.get(cls, 0) + int(n)
+            for cls, n in chunk.loc[is_test, TARGET_COLUMN].value_counts().items():
+                test_counts[cls] = test_counts.get(cls, 0) + int(n)
+            start += len(chunk)
+
+    return {'rows': start, 'class_counts': counts, 'test_counts': dict(sorted(test_counts.items()))}
+
+def prepare_data_streaming(fmt: str = DEFAULT_FORMAT, raw_path: Path = RAW_DATA_PATH, chunk_rows: int = CHUNK_ROWS,
+                           test_size: float = TEST_SIZE, random_state: int = RANDOM_STATE, split: str = "stratified") -> Dict:
+    """ Stratified train/test split of a file larger than memory.
+
+    Every row gets a pseudo-random rank from its position and random_state,
+    and per class the quota[class] lowest ranked rows go to test. The quotas
+    are the ones the in-memory train_test_split would use, so the class
+    proportions match it exactly, and because ranks do not depend on how the
+    file is chunked the split is identical for any chunk_rows.
+
+    A first pass reads only the target column to count classes and
+    histogram the ranks; the second pass streams full rows straight into
+    the train / test writers, buffering only the rows in each class's
+    boundary bucket until their exact order is known.
+
+    split="append-stable" uses holdout_mask instead, in a single pass, and
+    writes the same rows as prepare_data with that split.
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    if split == "append-stable":
+        return _stream_append_stable(fmt, raw_path, chunk_rows, test_size, random_state)
+    counts, histograms = _count_buckets(raw_path, chunk_rows, random_state)
+    quotas = class_quotas(counts, test_size, random_state)
+
+    #Per class: buckets below `boundary` are test, above are train, and `take` rows of the boundary bucket are test
+    boundary: Dict = {}
+    take: Dict = {}
+    for cls, quota in quotas.items():
+        cumulative = np.cumsum(histograms[cls])
+        b = int(np.searchsorted(cumulative, quota, side='left'))
+        boundary[cls] = b
+        take[cls] = quota - (int(cumulative[b - 1]) if b > 0 else 0)
+
+    shift = np.uint64(64 - HASH_BUCKET_BITS)
+    held = []
+    start = 0
+    with ChunkWriter(split_path('train', fmt)) as train_writer, ChunkWriter(split_path('test', fmt)) as test_writer:
+        for chunk in iter_chunks(raw_path, chunk_rows, COLUMN_DTYPES):
+            hashes = row_hashes(start, len(chunk), random_state)
+            buckets = (hashes >> shift).astype(np.int64)
+            cut = chunk[TARGET_COLUMN].map(boundary).to_numpy()
+            train_writer.write(chunk[buckets > cut])
+            test_writer.write(chunk[buckets < cut])
+            on_boundary = buckets == cut
+            if on_boundary.any():
+                held.append(chunk[on_boundary].assign(_rank=hashes[on_boundary]))
+            start += len(chunk)
+
+        if held:
+            boundary_rows = pd.concat(held, ignore_index=True).sort_values('_rank', kind='stable')
+            order = boundary_rows.groupby(TARGET_COLUMN).cumcount().to_numpy()
+            limit = boundary_rows[TARGET_COLUMN].map(take).to_numpy()
+            boundary_rows = boundary_rows.drop(columns='_rank')
+            test_writer.write(boundary_rows[order < limit])
+            train_writer.write(boundary_rows[order >= limit])
+
+    return {'rows': start, 'class_counts': counts, 'test_counts': quotas}
 
 if __name__ == "__main__":
-    prepare_data()
-    
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split the raw data into train and test")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="storage format of the processed splits")
+    parser.add_argument("--mode", choices=("memory", "streaming"), default="memory",
+                        help="streaming splits files larger than RAM chunk by chunk")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows per chunk in streaming mode")
+    parser.add_argument("--split", choices=SPLITS, default="stratified",
+                        help="append-stable keeps earlier rows in place on append, for incremental training")
+    args = parser.parse_args()
+    if args.mode == "streaming":
+        summary = prepare_data_streaming(args.format, chunk_rows=args.chunksize, split=args.split)
+        print(f"[OK] Streamed {summary['rows']} rows, test rows per class: {summary['test_counts']}")
+    else:
+        prepare_data(args.format, args.split)
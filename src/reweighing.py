@@ -0,0 +1,40 @@
+from typing import Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+from data_io import TARGET_COLUMN
+
+
+def reweighing_weights(df: pd.DataFrame, sensitive: Union[str, Iterable[str]], label: str = TARGET_COLUMN) -> np.ndarray:
+    """ Kamiran-Calders reweighing: w(g, y) = P(g) * P(y) / P(g, y) for every row.
+
+    Rows of under-represented (group, label) combinations get weights above
+    1 and over-represented ones below 1, so a model fitted with these
+    sample weights sees the label as independent of the group. With several
+    sensitive columns the group is their combination (intersectional
+    groups); missing values form a group of their own.
+
+    One groupby over the rows gives the joint counts and a group code per
+    row; the marginals are summed from the joint table, and the per-cell
+    weights are mapped back to rows by indexing with the codes. They plug
+    straight into fit(sample_weight=...) and average to 1 as long as every
+    (group, label) combination occurs at least once.
+    """
+    sensitive: List[str] = [sensitive] if isinstance(sensitive, str) else list(sensitive)
+    if not sensitive:
+        raise ValueError("At least one sensitive column is required")
+    n = len(df)
+    if n == 0:
+        return np.ones(0)
+
+    grouped = df.groupby(sensitive + [label], sort=False, observed=True, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    joint = grouped.size()
+
+    group_levels = list(range(len(sensitive)))
+    group_counts = joint.groupby(level=group_levels, dropna=False).transform('sum').to_numpy()
+    label_counts = joint.groupby(level=len(sensitive), dropna=False).transform('sum').to_numpy()
+    #P(g) * P(y) / P(g, y) with the common 1/n factors cancelled
+    cell_weights = group_counts * label_counts / (joint.to_numpy() * float(n))
+    return cell_weights[codes]
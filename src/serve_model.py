@@ -0,0 +1,251 @@
+import asyncio
+import io
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, ValidationError
+
+from fast_scorer import LinearScorer
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow input is optional, columnar JSON always works
+    pa = None
+
+SCORER_PATH = Path('./models/iris_logistics_regression.npz')
+PICKLE_PATH = Path('./models/iris_logistics_regression.pkl')
+#The exported NumPy scorer is preferred, the sklearn pickle is the fallback
+MODEL_PATH = Path(os.getenv('MODEL_PATH', str(SCORER_PATH if SCORER_PATH.exists() else PICKLE_PATH)))
+MAX_BATCH_SIZE = int(os.getenv('SERVE_MAX_BATCH_SIZE', '64'))
+MAX_WAIT_MS = float(os.getenv('SERVE_MAX_WAIT_MS', '2'))
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+
+class MicroBatcher:
+    """ Collects concurrent single-row requests into one vectorized predict call.
+
+    A batch is closed when it reaches max_batch_size rows or max_wait_ms after
+    its first row arrived, whichever comes first, so an idle service adds at
+    most max_wait_ms of latency while a busy one amortizes the per-call
+    overhead of the model across the whole batch.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError('Model server is shutting down'))
+
+    async def submit(self, row: np.ndarray) -> np.ndarray:
+        """ Queue one feature row and wait for its probability row """
+        if self._queue is None:
+            raise RuntimeError('MicroBatcher.start() has not been called')
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, fut))
+        return await fut
+
+    async def _next_batch(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            #Requests that were cancelled while queued are dropped from the batch
+            batch = [(row, fut) for row, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            try:
+                proba = self.predict_fn(np.stack([row for row, _ in batch]))
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for i, (_, fut) in enumerate(batch):
+                if not fut.done():
+                    fut.set_result(proba[i])
+
+
+class ModelServer:
+    """ The trained model plus its feature order, loaded once per process.
+
+    A .npz path loads the NumPy-only LinearScorer; anything else is treated
+    as the joblib pickle, which pulls in sklearn and pandas.
+    """
+
+    def __init__(self, model_path: Path):
+        if model_path.suffix == '.npz':
+            self.model = LinearScorer.load(model_path)
+            self.features: List[str] = self.model.features
+            self.classes: List = self.model.classes.tolist()
+            self._predict_proba = self.model.predict_proba
+        else:
+            import joblib
+            import pandas as pd
+
+            self.model = joblib.load(model_path)
+            self.features = [str(f) for f in self.model.feature_names_in_]
+            self.classes = self.model.classes_.tolist()
+            #The model was fitted on a DataFrame, so keep the column names to match
+            self._predict_proba = lambda X: self.model.predict_proba(pd.DataFrame(X, columns=self.features))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self._predict_proba(X)
+
+    def row(self, features: Dict[str, float]) -> np.ndarray:
+        missing = [f for f in self.features if f not in features]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing features: {missing}")
+        return np.array([features[f] for f in self.features], dtype=np.float64)
+
+    def matrix(self, columns: Dict[str, List[float]]) -> np.ndarray:
+        missing = [f for f in self.features if f not in columns]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing columns: {missing}")
+        lengths = {len(columns[f]) for f in self.features}
+        if len(lengths) > 1:
+            raise HTTPException(status_code=422, detail="All columns must have the same length")
+        return np.column_stack([np.asarray(columns[f], dtype=np.float64) for f in self.features])
+
+
+server: Optional[ModelServer] = None
+batcher: Optional[MicroBatcher] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global server, batcher
+    server = ModelServer(MODEL_PATH)
+    batcher = MicroBatcher(server.predict_proba, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
+    await batcher.start()
+    yield
+    await batcher.stop()
+
+
+app = FastAPI(title="Iris model server", version="1.0.0", lifespan=lifespan)
+
+
+class PredictRequest(BaseModel):
+    features: Dict[str, float]
+
+
+class PredictResponse(BaseModel):
+    prediction: int
+    probabilities: Dict[str, float]
+
+
+class BatchRequest(BaseModel):
+    columns: Dict[str, List[float]]
+
+
+@app.post("/predict", response_model=PredictResponse)
+async def predict(request: PredictRequest):
+    proba = await batcher.submit(server.row(request.features))
+    return PredictResponse(
+        prediction=server.classes[int(np.argmax(proba))],
+        probabilities={str(c): float(p) for c, p in zip(server.classes, proba)},
+    )
+
+
+def _read_arrow(body: bytes) -> Dict[str, np.ndarray]:
+    if pa is None:
+        raise HTTPException(status_code=415, detail="pyarrow is not installed, send columnar JSON instead")
+    table = pa.ipc.open_stream(body).read_all()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def _write_arrow(predictions: np.ndarray, proba: np.ndarray) -> bytes:
+    columns = {'prediction': predictions}
+    for i, c in enumerate(server.classes):
+        columns[f'proba_{c}'] = proba[:, i]
+    table = pa.table(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """ Score many rows in one call.
+
+    Accepts columnar JSON ({"columns": {feature: [values...]}}) or an Arrow
+    IPC stream (Content-Type: application/vnd.apache.arrow.stream); Arrow
+    requests get an Arrow stream back with prediction and proba_<class> columns.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    body = await request.body()
+    if content_type == ARROW_STREAM:
+        X = server.matrix(_read_arrow(body))
+    else:
+        try:
+            columns = BatchRequest.model_validate_json(body).columns
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False)) from None
+        X = server.matrix(columns)
+    #Large batches are scored off the event loop so /predict keeps flowing
+    proba = await asyncio.to_thread(server.predict_proba, X)
+    predictions = np.asarray(server.classes)[np.argmax(proba, axis=1)]
+    if content_type == ARROW_STREAM:
+        return Response(content=_write_arrow(predictions, proba), media_type=ARROW_STREAM)
+    return {
+        'predictions': predictions.tolist(),
+        'probabilities': {str(c): proba[:, i].tolist() for i, c in enumerate(server.classes)},
+    }
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "healthy",
+        "model": str(MODEL_PATH),
+        "batches": batcher.batches if batcher else 0,
+        "rows": batcher.rows if batcher else 0,
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=os.getenv('HOST', '127.0.0.1'), port=int(os.getenv('PORT', '8000')))
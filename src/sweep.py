@@ -0,0 +1,218 @@
+""" Cross-validated sweep over model families and hyperparameters.
+
+Each config in the grid (params.yaml: sweep) is scored with stratified
+k-fold CV in a process pool. Results are cached on disk per
+(config, training data hash), so re-running after adding configs only
+computes the new ones. The leaderboard (accuracy, fit time, predict
+latency per config) and the winning config are written as JSON; the
+train stage builds its model from the winner.
+
+    python ./src/sweep.py --format parquet --workers 8
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+import yaml
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from data_io import DEFAULT_FORMAT, FEATURE_COLUMNS, FORMATS, TARGET_COLUMN, read_frame, split_path
+
+SWEEP_DIR = Path('./sweep/')
+CACHE_DIR = SWEEP_DIR / 'cache'
+LEADERBOARD_PATH = SWEEP_DIR / 'leaderboard.json'
+BEST_CONFIG_PATH = SWEEP_DIR / 'best_config.json'
+PARAMS_PATH = Path('./params.yaml')
+RANDOM_STATE = 42
+
+#What train_model.py used before the sweep existed, and what it falls back to without a best config
+DEFAULT_CONFIG = {"family": "logistic_regression", "solver": "lbfgs", "C": 1.0, "max_iter": 200}
+
+DEFAULT_GRID = {
+    "cv_folds": 5,
+    "families": {
+        "logistic_regression": {"solver": ["lbfgs"], "C": [0.1, 1.0, 10.0], "max_iter": [200]},
+    },
+}
+
+
+def build_model(config: Dict[str, Any]):
+    """ Unfitted estimator for a config; every family stays exportable by fast_scorer """
+    family = config["family"]
+    if family == "logistic_regression":
+        return LogisticRegression(solver=config["solver"], C=config["C"], max_iter=config.get("max_iter", 200))
+    if family == "scaled_logistic_regression":
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("lr", LogisticRegression(solver=config["solver"], C=config["C"], max_iter=config.get("max_iter", 200))),
+        ])
+    if family == "sgd_log_loss":
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("sgd", SGDClassifier(loss="log_loss", alpha=config["alpha"], max_iter=config.get("max_iter", 1000),
+                                  tol=1e-4, random_state=RANDOM_STATE)),
+        ])
+    raise ValueError(f"Unknown model family {family!r}")
+
+
+def expand_grid(grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    configs = []
+    for family, space in grid["families"].items():
+        names = sorted(space)
+        for values in itertools.product(*(space[n] for n in names)):
+            configs.append({"family": family, **dict(zip(names, values))})
+    return configs
+
+
+def load_grid(path: Path = PARAMS_PATH) -> Dict[str, Any]:
+    if path.exists():
+        with open(path) as f:
+            params = yaml.safe_load(f) or {}
+        if "sweep" in params:
+            return params["sweep"]
+    return DEFAULT_GRID
+
+
+def load_best_config(path: Path = BEST_CONFIG_PATH) -> Dict[str, Any]:
+    """ Winning config of the last sweep, or DEFAULT_CONFIG when there is none """
+    try:
+        with open(path) as f:
+            return json.load(f)["config"]
+    except (OSError, ValueError, KeyError):
+        return dict(DEFAULT_CONFIG)
+
+
+def data_hash(df: pd.DataFrame) -> str:
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes() + json.dumps(list(df.columns)).encode(), digest_size=16).hexdigest()
+
+
+def cache_key(config: Dict[str, Any], dataset: str, folds: int) -> str:
+    raw = json.dumps({"config": config, "data": dataset, "folds": folds, "seed": RANDOM_STATE,
+                      "sklearn": sklearn.__version__}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+#Training data handed to each worker once by the pool initializer instead of with every task
+_X: Optional[pd.DataFrame] = None
+_y: Optional[pd.Series] = None
+
+
+def _init_worker(X: pd.DataFrame, y: pd.Series) -> None:
+    global _X, _y
+    _X, _y = X, y
+
+
+def evaluate(config: Dict[str, Any], folds: int) -> Dict[str, Any]:
+    """ CV accuracy, mean fit time and single-row / per-row predict latency of one config """
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    accuracies, fit_seconds, row_seconds = [], [], []
+    converged = True
+    for train_idx, val_idx in splitter.split(_X, _y):
+        model = build_model(config)
+        X_train, y_train = _X.iloc[train_idx], _y.iloc[train_idx]
+        X_val, y_val = _X.iloc[val_idx], _y.iloc[val_idx]
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ConvergenceWarning)
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds.append(time.perf_counter() - start)
+        converged &= not any(issubclass(w.category, ConvergenceWarning) for w in caught)
+        start = time.perf_counter()
+        preds = model.predict(X_val)
+        row_seconds.append((time.perf_counter() - start) / len(X_val))
+        accuracies.append(float((preds == y_val.to_numpy()).mean()))
+
+    #Single-row latency is what an online caller sees, measured on the last fold's model
+    one_row = X_val.iloc[:1]
+    timings = []
+    for _ in range(50):
+        start = time.perf_counter()
+        model.predict(one_row)
+        timings.append(time.perf_counter() - start)
+    return {
+        "config": config,
+        "cv_accuracy_mean": float(np.mean(accuracies)),
+        "cv_accuracy_std": float(np.std(accuracies)),
+        "fit_seconds": float(np.mean(fit_seconds)),
+        "predict_latency_ms": float(np.median(timings) * 1000),
+        "predict_us_per_row_batch": float(np.mean(row_seconds) * 1e6),
+        "converged": bool(converged),
+    }
+
+
+def rank(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Converged configs first, then best accuracy; near ties go to the steadier CV score, then the config itself.
+
+    Timings are reported but never ranked on, they are too noisy to pick a winner between equally accurate configs.
+    """
+    return sorted(results, key=lambda r: (not r["converged"], -round(r["cv_accuracy_mean"], 6),
+                                          round(r["cv_accuracy_std"], 6), json.dumps(r["config"], sort_keys=True)))
+
+
+def run_sweep(X: pd.DataFrame, y: pd.Series, grid: Dict[str, Any], workers: int, cache_dir: Path = CACHE_DIR) -> List[Dict[str, Any]]:
+    folds = int(grid.get("cv_folds", 5))
+    dataset = data_hash(pd.concat([X, y], axis=1))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    results, pending = [], []
+    for config in expand_grid(grid):
+        key = cache_key(config, dataset, folds)
+        path = cache_dir / f"{key}.json"
+        if path.exists():
+            with open(path) as f:
+                results.append({**json.load(f), "cached": True})
+        else:
+            pending.append((key, config))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            futures = [(key, pool.submit(evaluate, config, folds)) for key, config in pending]
+            for key, future in futures:
+                result = future.result()
+                with open(cache_dir / f"{key}.json", "w") as f:
+                    json.dump(result, f)
+                results.append({**result, "cached": False})
+    return rank(results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="storage format of the processed splits")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    train_df = read_frame(split_path('train', args.format), columns=FEATURE_COLUMNS + [TARGET_COLUMN])
+    X, y = train_df[FEATURE_COLUMNS], train_df[TARGET_COLUMN]
+    start = time.perf_counter()
+    leaderboard = run_sweep(X, y, load_grid(), args.workers)
+    elapsed = time.perf_counter() - start
+
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LEADERBOARD_PATH, "w") as f:
+        json.dump(leaderboard, f, indent=2)
+    with open(BEST_CONFIG_PATH, "w") as f:
+        json.dump({"config": leaderboard[0]["config"], "cv_accuracy_mean": leaderboard[0]["cv_accuracy_mean"]}, f, indent=2)
+
+    computed = sum(not r["cached"] for r in leaderboard)
+    print(f"[OK] Swept {len(leaderboard)} configs ({computed} computed, {len(leaderboard) - computed} cached) in {elapsed:.1f}s")
+    print(f"[OK] Best config: {leaderboard[0]['config']} cv accuracy {leaderboard[0]['cv_accuracy_mean']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
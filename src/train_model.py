@@ -1,17 +1,25 @@
+import argparse
 import json
+import time
 from pathlib import Path
 import subprocess
+from typing import List, Optional
 import pandas as pd
 import joblib
 
-from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
 
-TRAIN_PATH = Path('./data/processed/train.csv')
-TEST_PATH = Path('./data/processed/test.csv')
+from data_io import DEFAULT_FORMAT, FEATURE_COLUMNS, FORMATS, TARGET_COLUMN, read_frame, split_path
+from fast_scorer import export_linear_model
+from incremental import delta_start, fingerprint, load_state, make_sgd_model, partial_update, save_state
+from reweighing import reweighing_weights
+from sweep import BEST_CONFIG_PATH, build_model, load_best_config
+
 MODEL_DIR = Path('./models/')
 METRICS_DIR = Path('./metrics/')
+MODEL_PATH = MODEL_DIR / 'iris_logistics_regression.pkl'
+#Incremental mode retrains from scratch after this many delta updates
+FULL_RETRAIN_EVERY = 10
 
 def get_git_commit_hash() -> str:
     try:
@@ -19,30 +27,113 @@ def get_git_commit_hash() -> str:
     except Exception:   
         return "unknown"
 
-def main():
+def train_incremental(train_df: pd.DataFrame, full_retrain_every: int = FULL_RETRAIN_EVERY):
+    """ Update the SGD model on rows appended since the last run, or retrain it from scratch.
+
+    Returns the model and a dict describing what was done for the metrics file.
+    """
+    X, y = train_df[FEATURE_COLUMNS], train_df[TARGET_COLUMN]
+    state = load_state()
+    model = None
+    reason = None
+    start = None
+    if state is None:
+        reason = 'no previous training state'
+    elif state['updates_since_full'] >= full_retrain_every:
+        reason = f"scheduled full retrain after {state['updates_since_full']} incremental updates"
+    else:
+        start = delta_start(state['fingerprint'], train_df)
+        if start is None:
+            reason = 'previously trained rows changed (prepare.split: append-stable keeps them in place)'
+        elif not set(y.iloc[start:].unique().tolist()) <= set(state['classes']):
+            reason = 'new target class'
+        else:
+            try:
+                model = joblib.load(MODEL_PATH)
+            except Exception:
+                model = None
+            if not hasattr(model, 'named_steps') or 'sgd' not in model.named_steps:
+                reason = 'no incremental model to update'
+                model = None
+
+    if model is not None:
+        training = {'mode': 'incremental', 'rows_processed': len(train_df) - start}
+        updates_since_full = state['updates_since_full']
+        #No appended rows leaves the model and the retrain schedule untouched
+        if start < len(train_df):
+            partial_update(model, X.iloc[start:], y.iloc[start:], state['classes'])
+            updates_since_full += 1
+    else:
+        model = make_sgd_model()
+        model.fit(X, y)
+        training = {'mode': 'full', 'full_retrain_reason': reason, 'rows_processed': len(train_df)}
+        updates_since_full = 0
+
+    save_state({
+        'fingerprint': fingerprint(train_df),
+        'classes': sorted(model.classes_.tolist()),
+        'updates_since_full': updates_since_full,
+    })
+    return model, training
+
+def fit_with_weights(model, X, y, sample_weight):
+    """ fit() with sample weights, routed to the final step when the model is a Pipeline """
+    if sample_weight is None:
+        return model.fit(X, y)
+    if hasattr(model, 'steps'):
+        return model.fit(X, y, **{f"{model.steps[-1][0]}__sample_weight": sample_weight})
+    return model.fit(X, y, sample_weight=sample_weight)
+
+def main(fmt: str = DEFAULT_FORMAT, mode: str = 'full', full_retrain_every: int = FULL_RETRAIN_EVERY,
+         config_path: Path = BEST_CONFIG_PATH, reweigh_by: Optional[List[str]] = None):
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
     METRICS_DIR.mkdir(parents=True, exist_ok=True)
     
-    train_df = pd.read_csv(TRAIN_PATH)
-    test_df = pd.read_csv(TEST_PATH)
+    #Only the model columns are read, Parquet skips everything else on disk
+    columns = FEATURE_COLUMNS + [TARGET_COLUMN]
+    reweigh_by = reweigh_by or []
+    train_df = read_frame(split_path('train', fmt), columns=columns + [c for c in reweigh_by if c not in columns])
+    test_df = read_frame(split_path('test', fmt), columns=columns)
     
-    X_train = train_df.drop(columns=['target'])
-    y_train = train_df['target']
-    X_test = test_df.drop(columns=['target'])
-    y_test = test_df['target']
+    X_train = train_df[FEATURE_COLUMNS]
+    y_train = train_df[TARGET_COLUMN]
+    X_test = test_df[FEATURE_COLUMNS]
+    y_test = test_df[TARGET_COLUMN]
     
-    model = LogisticRegression(max_iter=200)
-    model.fit(X_train, y_train)
+    train_start = time.perf_counter()
+    if mode == 'incremental':
+        model, training = train_incremental(train_df, full_retrain_every)
+    else:
+        #The sweep winner, or LogisticRegression(max_iter=200) when no sweep has run
+        config = load_best_config(config_path)
+        model = build_model(config)
+        #Kamiran-Calders weights make the label independent of the sensitive columns in the training data
+        sample_weight = reweighing_weights(train_df, reweigh_by) if reweigh_by else None
+        fit_with_weights(model, X_train, y_train, sample_weight)
+        training = {'mode': 'full', 'rows_processed': len(train_df)}
+        #Fresh state for this data; a later incremental run sees no SGD model to update and retrains in full
+        save_state({'fingerprint': fingerprint(train_df), 'classes': sorted(model.classes_.tolist()), 'updates_since_full': 0})
+    train_seconds = time.perf_counter() - train_start
     
     preds = model.predict(X_test)
     accuracy = accuracy_score(y_test, preds)
     
-    model_path = MODEL_DIR / 'iris_logistics_regression.pkl'
+    model_path = MODEL_PATH
     joblib.dump(model, model_path)
     
+    #Lightweight copy for serving without sklearn, see fast_scorer.LinearScorer
+    scorer_path = export_linear_model(model, MODEL_DIR / 'iris_logistics_regression.npz')
+    
     metrics = {
         'accuracy': accuracy,
-        'git_commit_hash': get_git_commit_hash()
+        'git_commit_hash': get_git_commit_hash(),
+        'training_mode': training['mode'],
+        'model_config': config if mode != 'incremental' else {'family': 'sgd_log_loss', 'incremental': True},
+        'full_retrain_reason': training.get('full_retrain_reason'),
+        'train_seconds': train_seconds,
+        'rows_processed': training['rows_processed'],
+        'rows_total': len(train_df),
+        'reweighed_by': reweigh_by if mode != 'incremental' else [],
     }
     
     metrics_path = METRICS_DIR / 'metrics.json'
@@ -50,8 +141,21 @@ def main():
         json.dump(metrics, f)
     
     print(f"[OK] Model trained and metrics saved to {model_path}")
+    print(f"[OK] Scorer exported to {scorer_path}")
     print(f"[OK] Accuracy Score: {accuracy}")
+    print(f"[OK] Training mode: {training['mode']}, {training['rows_processed']} rows in {train_seconds:.3f}s")
     print(f"[OK] Git Commit Hash: {get_git_commit_hash()}")
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the iris model")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="storage format of the processed splits")
+    parser.add_argument("--mode", choices=("full", "incremental"), default="full",
+                        help="incremental updates an SGD model with only the rows appended since the last run")
+    parser.add_argument("--full-retrain-every", type=int, default=FULL_RETRAIN_EVERY,
+                        help="incremental updates between full retrains")
+    parser.add_argument("--config", type=Path, default=BEST_CONFIG_PATH, help="model config JSON written by the sweep stage")
+    parser.add_argument("--reweigh-by", default="",
+                        help="comma separated sensitive columns to reweigh by (Kamiran-Calders, full mode only)")
+    args = parser.parse_args()
+    main(args.format, args.mode, args.full_retrain_every, args.config,
+         [c.strip() for c in args.reweigh_by.split(',') if c.strip()])
\ No newline at end of file
@@ -1,41 +1,153 @@
+import argparse
+import json
+import math
 import sys
 from pathlib import Path
+from typing import Dict, List, Optional
 
 import pandas as pd
 
-TRAIN_PATH = Path('./data/processed/train.csv')
-
-EXPECTED_COLUMNS = [
-    "sepal length (cm)",
-    "sepal width (cm)",
-    "petal length (cm)",
-    "petal width (cm)",
-    "target"
-]
-
-def main() -> int:
-    if not TRAIN_PATH.exists():
-        print(f"Error: {TRAIN_PATH} does not exist.", file=sys.stderr)
-        sys.exit(1)
-    
-    df = pd.read_csv(TRAIN_PATH)
-    
-    #Column check
-    cols = list[any](df.columns)
-    if(cols != EXPECTED_COLUMNS):
-        print(f"Error: {TRAIN_PATH} does not contains the expected columns.")
-        return 1;
+from data_io import COLUMN_DTYPES, DEFAULT_FORMAT, FEATURE_COLUMNS, FORMATS, TARGET_COLUMN, columns_of, iter_chunks, split_path
 
+REPORT_PATH = Path('./metrics/validation_report.json')
+CHUNK_ROWS = 100_000
+
+EXPECTED_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+#Explicit dtypes so pandas never has to infer them chunk by chunk; Int64 keeps missing targets visible as nulls
+DTYPES = {**COLUMN_DTYPES, TARGET_COLUMN: "Int64"}
+
+#Inclusive bounds for the measurements, anything outside is a data error
+VALUE_RANGES = {c: (0.0, 100.0) for c in FEATURE_COLUMNS}
+
+ALLOWED_TARGETS = {0, 1, 2}
+
+
+class ValidationError(Exception):
+    """ A fatal problem in the data, validation stops at the first one """
+
+
+class ColumnStats:
+    """ Running count / nulls / min / max / mean / std for one column, O(1) memory """
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values: pd.Series) -> None:
+        nulls = int(values.isna().sum())
+        self.nulls += nulls
+        present = values.dropna().astype("float64")
+        if present.empty:
+            return
+        lo, hi = float(present.min()), float(present.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        #Chan et al. merge of the chunk's mean and squared deviations, no cancellation when the mean dwarfs the spread
+        n, mean = len(present), float(present.mean())
+        m2 = float(((present - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        mean = self._mean if self.count else None
+        std = math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else None
+        return {"count": self.count, "nulls": self.nulls, "min": self.min, "max": self.max, "mean": mean, "std": std}
+
+
+def check_header(path: Path) -> None:
+    cols = columns_of(path)
+    if cols != EXPECTED_COLUMNS:
+        raise ValidationError(f"{path} does not contains the expected columns: expected {EXPECTED_COLUMNS}, got {cols}")
+
+
+def check_chunk(path: Path, chunk: pd.DataFrame, first_row: int) -> None:
     #NULL check
-    null_counts = df.isnull().sum()
-    if(null_counts.any()):
-        print(f"Error: {TRAIN_PATH} contains null values:\n")
-        return 1;
-    
-    print(f"[OK] Data validation passed for {TRAIN_PATH}")
-    
-    return 0;
+    null_counts = chunk.isnull().sum()
+    if null_counts.any():
+        column = null_counts[null_counts > 0].index[0]
+        row = first_row + int(chunk[column].isna().to_numpy().argmax())
+        raise ValidationError(f"{path} contains null values in {column!r} (first at row {row})")
+
+    #Range check
+    for column, (lo, hi) in VALUE_RANGES.items():
+        bad = (chunk[column] < lo) | (chunk[column] > hi)
+        if bad.any():
+            row = first_row + int(bad.to_numpy().argmax())
+            raise ValidationError(f"{path} has {column!r} = {chunk[column].iloc[row - first_row]} outside [{lo}, {hi}] at row {row}")
+
+    #Target check
+    unexpected = set(chunk[TARGET_COLUMN].unique().tolist()) - ALLOWED_TARGETS
+    if unexpected:
+        raise ValidationError(f"{path} has unexpected target classes {sorted(unexpected)}, allowed {sorted(ALLOWED_TARGETS)}")
+
+
+def validate_file(path: Path, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """ Stream one split (CSV or Parquet) in chunks of chunk_rows, raising ValidationError at the first fatal problem.
+
+    Returns per-column statistics and target class counts; memory use depends
+    on chunk_rows only, not on the size of the file.
+    """
+    report = {"path": str(path), "rows": 0, "columns": {c: ColumnStats() for c in EXPECTED_COLUMNS}, "target_counts": {}}
+    if not path.exists():
+        raise ValidationError(f"{path} does not exist.")
+    check_header(path)
+    try:
+        for chunk in iter_chunks(path, chunk_rows, DTYPES):
+            check_chunk(path, chunk, report["rows"])
+            for column, stats in report["columns"].items():
+                stats.update(chunk[column])
+            for cls, n in chunk[TARGET_COLUMN].value_counts().items():
+                report["target_counts"][int(cls)] = report["target_counts"].get(int(cls), 0) + int(n)
+            report["rows"] += len(chunk)
+    except (ValueError, TypeError) as e:
+        #Explicit dtypes turn a non-numeric value into a parse error
+        raise ValidationError(f"{path} has a value that does not match the schema near row {report['rows']}: {e}") from None
+    if report["rows"] == 0:
+        raise ValidationError(f"{path} contains no rows.")
+    return report
+
+
+def _serialisable(report: Dict) -> Dict:
+    out = dict(report)
+    out["columns"] = {c: s.to_dict() for c, s in report["columns"].items()}
+    out["target_counts"] = {str(k): v for k, v in sorted(report["target_counts"].items())}
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Streaming schema, null, range and target validation of the processed data")
+    parser.add_argument("paths", nargs="*", type=Path, help="files to validate, defaults to the train and test splits")
+    parser.add_argument("--format", choices=FORMATS, default=DEFAULT_FORMAT, help="format of the default train and test splits")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows per chunk")
+    parser.add_argument("--report", type=Path, default=REPORT_PATH, help="where to write the JSON report")
+    args = parser.parse_args(argv)
+    paths = args.paths or [split_path('train', args.format), split_path('test', args.format)]
+
+    result = {"status": "passed", "error": None, "files": {}}
+    status = 0
+    for path in paths:
+        try:
+            result["files"][path.name] = _serialisable(validate_file(path, args.chunksize))
+        except ValidationError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            result["status"] = "failed"
+            result["error"] = str(e)
+            status = 1
+            break
+        print(f"[OK] Data validation passed for {path}")
+
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(result, f, indent=2)
+    return status
 
 if __name__ == "__main__":
     sys.exit(main())
-    
\ No newline at end of file